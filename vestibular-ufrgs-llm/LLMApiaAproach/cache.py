@@ -0,0 +1,361 @@
+"""
+Answer caches for the UFRGS Vestibular Test LLM Processor.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ufrgs_llm", "answers.sqlite")
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ufrgs_llm", "responses.sqlite")
+
+# Number of hash buckets used by embed_text
+EMBEDDING_DIM = 1024
+
+# Minimum cosine similarity for a near-duplicate hit with trigram embeddings
+TRIGRAM_THRESHOLD = 0.9
+
+# Alternative markers as extracted by pdf_parser: "(A) ... (B) ..."
+ALTERNATIVE_RE = re.compile(r'\(([A-E])\)')
+
+
+def embed_text(text, dim=EMBEDDING_DIM):
+    """
+    Embed text as a normalized bag of hashed character trigrams.
+
+    Cheap and dependency-free; good enough to recognise the same question
+    re-extracted with small differences (whitespace, footers, typos).
+
+    Args:
+        text: Text to embed
+        dim: Number of hash buckets
+
+    Returns:
+        Sparse vector as a dict mapping bucket index to weight
+    """
+    text = ' '.join(text.lower().split())
+    counts = {}
+    for i in range(len(text) - 2):
+        bucket = zlib.crc32(text[i:i + 3].encode('utf-8')) % dim
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    if norm == 0:
+        return {}
+    return {bucket: v / norm for bucket, v in counts.items()}
+
+
+def alternatives_key(text):
+    """
+    Fingerprint of a question's alternatives, in order.
+
+    A cached letter is only right for a question whose alternatives are the
+    same and in the same order, so near-duplicate hits require equal keys.
+
+    Args:
+        text: Question text
+
+    Returns:
+        Hex digest of the alternatives, or None when fewer than two were found
+    """
+    parts = ALTERNATIVE_RE.split(text)
+    # parts = [stem, letter, option, letter, option, ...]
+    alternatives = [
+        f"{letter} {' '.join(option.lower().split())}"
+        for letter, option in zip(parts[1::2], parts[2::2])
+    ]
+    if len(alternatives) < 2:
+        return None
+    return hashlib.md5("\0".join(alternatives).encode('utf-8')).hexdigest()
+
+
+def cosine_similarity(a, b):
+    """Cosine similarity between two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class SentenceTransformerEmbedder:
+    """
+    Dense sentence embeddings from a local sentence-transformers model.
+
+    Catches reworded stems (spacing, punctuation, paraphrased instructions)
+    that character trigrams miss. Requires the optional sentence-transformers
+    package; the model is loaded on first use.
+    """
+
+    # Paraphrases of the same question score above this with MiniLM-sized models
+    default_threshold = 0.92
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self.name = model_name
+        self._model = None
+
+    def __call__(self, text):
+        """Embed text as a normalized vector (list of floats)."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True).tolist()
+
+
+class SemanticCache:
+    """
+    Persistent question -> answer cache with exact and optional near-duplicate lookup.
+
+    Entries are stored in SQLite and scoped by namespace (e.g. "gemini:gemini-2.0-flash"),
+    so answers from one model are never returned for another.
+
+    By default only the exact question text is a hit. Near-duplicate lookup
+    (near_duplicates=True) is opt-in: a small edit such as "NÃO" or a
+    different number can change the right letter while keeping the text
+    almost identical. Near duplicates are found with hashed character
+    trigrams (embed_text), or with a dense embedder such as
+    SentenceTransformerEmbedder, and must have the same alternatives in the
+    same order (see alternatives_key).
+    Entries written with a dense embedder are kept apart from the others,
+    since their vectors aren't comparable.
+    """
+
+    def __init__(self, namespace, path=DEFAULT_CACHE_PATH, threshold=None, ttl=86400, embedder=None,
+                 near_duplicates=False):
+        """
+        Initialize the cache.
+
+        Args:
+            namespace: Scope for the entries (usually provider and model)
+            path: Path to the SQLite database
+            threshold: Minimum cosine similarity for a near-duplicate hit
+                (defaults to TRIGRAM_THRESHOLD, or the embedder's default_threshold)
+            ttl: Time to live of an entry in seconds (None means forever)
+            embedder: Optional callable mapping text to a normalized dense vector
+            near_duplicates: Also return answers of similar questions
+                (off by default: only exact matches are hits)
+        """
+        if not near_duplicates:
+            threshold = None
+        elif threshold is None:
+            threshold = getattr(embedder, "default_threshold", TRIGRAM_THRESHOLD)
+        if embedder is not None:
+            namespace = f"{namespace}|{embedder.name}"
+
+        self.namespace = namespace
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.embedder = embedder
+        # Dense vectors stacked as a matrix per alternatives key, for one
+        # matrix-vector product per lookup
+        self._matrices = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, embedding TEXT NOT NULL, "
+            "answer TEXT NOT NULL, created_at REAL NOT NULL, alternatives TEXT)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if "alternatives" not in columns:
+            # Older caches: their entries stay usable as exact matches
+            self._conn.execute("ALTER TABLE answers ADD COLUMN alternatives TEXT")
+        self._conn.commit()
+
+        # Keep the namespace in memory: exams have ~100 questions, so a
+        # linear similarity scan is far cheaper than a single LLM call
+        self._entries = {}
+        min_created = time.time() - ttl if ttl is not None else 0
+        rows = self._conn.execute(
+            "SELECT key, embedding, answer, alternatives FROM answers "
+            "WHERE namespace = ? AND created_at >= ?",
+            (namespace, min_created)
+        )
+        for key, embedding, answer, alternatives in rows:
+            vector = json.loads(embedding)
+            if embedder is None:
+                vector = {int(k): v for k, v in vector.items()}
+            self._entries[key] = (vector, answer, alternatives)
+
+    def _key(self, text):
+        return hashlib.md5(f"{self.namespace}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, text):
+        """
+        Look up the answer for a question.
+
+        Args:
+            text: Question text
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        entry = self._entries.get(self._key(text))
+        answer = entry[1] if entry else None
+
+        if answer is None and self.threshold is not None:
+            alternatives = alternatives_key(text)
+            if alternatives is not None:
+                best_score, best_answer = self._most_similar(text, alternatives)
+                if best_score >= self.threshold:
+                    answer = best_answer
+
+        if answer is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return answer
+
+    def set(self, text, answer):
+        """
+        Store the answer for a question.
+
+        Args:
+            text: Question text
+            answer: Answer returned by the LLM
+        """
+        key = self._key(text)
+        vector = self._embed(text)
+        alternatives = alternatives_key(text)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO answers (key, namespace, embedding, answer, created_at, alternatives) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, self.namespace, json.dumps(vector), answer, time.time(), alternatives)
+        )
+        self._conn.commit()
+        self._entries[key] = (vector, answer, alternatives)
+        self._matrices.pop(alternatives, None)
+
+    def _embed(self, text):
+        return embed_text(text) if self.embedder is None else self.embedder(text)
+
+    def _most_similar(self, text, alternatives):
+        """
+        Return (similarity, answer) of the cached entry closest to text.
+
+        Only entries with the given alternatives key are candidates; with
+        none, the similarity is 0.
+        """
+        if self.embedder is None:
+            candidates = [(v, a) for v, a, alt in self._entries.values() if alt == alternatives]
+            if not candidates:
+                return 0.0, None
+            vector = self._embed(text)
+            return max(
+                ((cosine_similarity(vector, cached), cached_answer)
+                 for cached, cached_answer in candidates),
+                key=lambda x: x[0]
+            )
+
+        # Normalized vectors: the inner product is the cosine similarity
+        if alternatives not in self._matrices:
+            candidates = [(v, a) for v, a, alt in self._entries.values() if alt == alternatives]
+            self._matrices[alternatives] = (
+                np.array([v for v, _ in candidates], dtype=np.float32),
+                [a for _, a in candidates]
+            )
+        matrix, answers = self._matrices[alternatives]
+        if not answers:
+            return 0.0, None
+        scores = matrix @ np.asarray(self._embed(text), dtype=np.float32)
+        best = int(np.argmax(scores))
+        return float(scores[best]), answers[best]
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
+
+
+class ResponseCache:
+    """
+    Persistent exact-match cache of raw LLM responses.
+
+    Keyed by a hash of everything that determines the response (provider,
+    model, prompts and temperature). Safe to share between the worker
+    threads used by LLMClient.
+    """
+
+    def __init__(self, path=DEFAULT_RESPONSE_CACHE_PATH, ttl=None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the SQLite database
+            ttl: Time to live of an entry in seconds (None means forever)
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider, model, system, user, temperature):
+        """Build the cache key for a request."""
+        payload = json.dumps(
+            {"provider": provider, "model": model, "system": system,
+             "user": user, "temperature": temperature},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a response.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        min_created = time.time() - self.ttl if self.ttl is not None else 0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, min_created)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, response):
+        """
+        Store a response.
+
+        Args:
+            key: Key from make_key
+            response: Text returned by the LLM
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,70 @@
-import os
-from dotenv import load_dotenv
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-# Load environment variables
-load_dotenv()
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    from tqdm.auto import tqdm
+except ImportError:
+    tqdm = None
+
+# Provider information lives in a dependency-free module; re-exported here
+from providers import PROVIDER_INFO, get_env
+from utils import run_sync
+
+# System prompts are sent first and never change between requests, so providers
+# with prompt-prefix caching (OpenAI automatically, Anthropic via cache_control)
+# can reuse them. Keep them byte-stable: no timestamps or per-run values.
+SYSTEM_PROMPT = """Você responde questões do vestibular da UFRGS.
+IMPORTANTE: Responda APENAS com a letra da alternativa correta (A, B, C, D ou E).
+NÃO forneça explicações, justificativas ou texto adicional.
+Responda somente: A, B, C, D ou E."""
+
+BATCH_SYSTEM_PROMPT = """Você responde questões do vestibular da UFRGS.
+Você receberá várias questões numeradas (Q1, Q2, ...).
+IMPORTANTE: Para cada questão, responda APENAS com a letra da alternativa correta (A, B, C, D ou E).
+NÃO forneça explicações, justificativas ou texto adicional.
+Responda somente com um objeto JSON no formato: {"1": "A", "2": "C", ...}"""
+
+# Answers are a single letter; a few tokens leave room for "A)" or "A."
+# and keep a model that starts explaining from running up the bill
+ANSWER_MAX_TOKENS = 5
+
+# Possible answers, used to constrain decoding where the provider allows it
+ANSWER_LETTERS = ("A", "B", "C", "D", "E")
+
+# Ollama structured output: an object with a single answer letter
+OLLAMA_ANSWER_FORMAT = {
+    "type": "object",
+    "properties": {"answer": {"type": "string", "enum": list(ANSWER_LETTERS)}},
+    "required": ["answer"]
+}
+
+# Prior answers needed before a consensus can replace an LLM call
+CONSENSUS_MIN_VOTES = 2
+
+# Batch answers are a JSON object, about '"12": "A", ' per question
+BATCH_MAX_TOKENS_PER_QUESTION = 8
+
+# OpenAI models served by the (legacy) completions endpoint, which accepts a
+# list of prompts in one request. Chat models don't; they batch questions
+# into a single prompt instead (see answer_question_batch).
+COMPLETION_MODELS = ("gpt-3.5-turbo-instruct", "davinci-002", "babbage-002")
+
+# HTTP statuses worth retrying: rate limits, request timeouts and server errors
+RETRYABLE_STATUS = (408, 429)
+
+# Exceptions without a status that are retried: timeouts and connection
+# errors, matched by name since each SDK has its own classes
+RETRYABLE_ERRORS = ("APITimeoutError", "APIConnectionError", "Timeout", "ConnectTimeout",
+                    "ReadTimeout", "ConnectionError")
 
 
 class LLMClient:
@@ -15,7 +77,8 @@ class LLMClient:
     - Ollama (local, completely free)
     """
     
-    def __init__(self, provider="openai", api_key=None, model=None, base_url=None):
+    def __init__(self, provider="openai", api_key=None, model=None, base_url=None, concurrency=None,
+                 max_retries=3, cache=None):
         """
         Initialize the LLM client.
         
@@ -24,6 +87,12 @@ class LLMClient:
             api_key: API key for the provider (if needed)
             model: Model name (defaults to provider's recommended model)
             base_url: Base URL for API (mainly for Ollama)
+            concurrency: Maximum number of requests in flight at once
+                (defaults to a per-provider value that respects rate limits)
+            max_retries: How many times a failed request is retried, waiting
+                1s, 2s, 4s, ... between attempts
+            cache: Optional ResponseCache; identical requests are answered from
+                it instead of calling the provider again
         """
         self.provider = provider.lower()
         self.api_key = api_key
@@ -40,6 +109,23 @@ class LLMClient:
         
         self.model = model or default_models.get(self.provider, "gpt-4o-mini")
         
+        # Set default concurrency for each provider (free tiers are rate limited)
+        default_concurrency = {
+            "openai": 16,
+            "gemini": 8,
+            "groq": 4,
+            "anthropic": 8,
+            "ollama": 2
+        }
+        
+        self.concurrency = concurrency or default_concurrency.get(self.provider, 4)
+        self.max_retries = max_retries
+        self.temperature = 0.3
+        
+        self.cache = cache
+        self.stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        
         # Initialize provider-specific client
         self._init_provider()
     
@@ -47,14 +133,15 @@ class LLMClient:
         """Initialize the specific provider client."""
         if self.provider == "openai":
             from openai import OpenAI
-            self.api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+            self.api_key = self.api_key or get_env("OPENAI_API_KEY")
             if not self.api_key:
                 raise ValueError("OpenAI API key required. Set OPENAI_API_KEY or pass api_key parameter.")
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, max_retries=0)
+            self._letter_bias = self._openai_letter_bias()
             
         elif self.provider == "gemini":
             import google.generativeai as genai
-            self.api_key = self.api_key or os.getenv("GEMINI_API_KEY")
+            self.api_key = self.api_key or get_env("GEMINI_API_KEY")
             if not self.api_key:
                 raise ValueError("Gemini API key required. Set GEMINI_API_KEY or pass api_key parameter.")
             genai.configure(api_key=self.api_key)
@@ -62,87 +149,309 @@ class LLMClient:
             
         elif self.provider == "groq":
             from groq import Groq
-            self.api_key = self.api_key or os.getenv("GROQ_API_KEY")
+            self.api_key = self.api_key or get_env("GROQ_API_KEY")
             if not self.api_key:
                 raise ValueError("Groq API key required. Set GROQ_API_KEY or pass api_key parameter.")
-            self.client = Groq(api_key=self.api_key)
+            self.client = Groq(api_key=self.api_key, max_retries=0)
             
         elif self.provider == "anthropic":
             from anthropic import Anthropic
-            self.api_key = self.api_key or os.getenv("ANTHROPIC_API_KEY")
+            self.api_key = self.api_key or get_env("ANTHROPIC_API_KEY")
             if not self.api_key:
                 raise ValueError("Anthropic API key required. Set ANTHROPIC_API_KEY or pass api_key parameter.")
-            self.client = Anthropic(api_key=self.api_key)
+            self.client = Anthropic(api_key=self.api_key, max_retries=0)
             
         elif self.provider == "ollama":
-            self.base_url = self.base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+            import requests
+            self.base_url = self.base_url or get_env("OLLAMA_BASE_URL", "http://localhost:11434")
             self.client = None  # Ollama uses direct HTTP requests
+            # Keep-alive session shared by all requests
+            self._http = requests.Session()
+            self._http_pool_size = 0
+            self._size_http_pool(self.concurrency)
             
         else:
             raise ValueError(f"Unknown provider: {self.provider}. Supported: openai, gemini, groq, anthropic, ollama")
     
+    def _size_http_pool(self, concurrency):
+        """
+        Make sure the Ollama session pools at least one connection per concurrent request.
+        
+        A call can override self.concurrency; with a smaller pool the extra
+        requests would open (and drop) a new connection each time.
+        """
+        if concurrency <= self._http_pool_size:
+            return
+        import requests
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        self._http_pool_size = concurrency
+    
+    def _openai_letter_bias(self):
+        """
+        Build a logit_bias that only lets the model emit one of ANSWER_LETTERS.
+        
+        Returns None when tiktoken isn't installed, doesn't know the model
+        or a letter isn't a single token; answers are then unconstrained.
+        """
+        if tiktoken is None:
+            return None
+        try:
+            encoding = tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            return None
+        
+        tokens = [encoding.encode(letter) for letter in ANSWER_LETTERS]
+        if any(len(token) != 1 for token in tokens):
+            return None
+        return {str(token[0]): 100 for token in tokens}
+    
+    def close(self):
+        """Close the HTTP connections held by the client."""
+        http = getattr(self, "_http", None)
+        if http is not None:
+            http.close()
+        # The OpenAI, Groq and Anthropic SDK clients keep their own connection pool
+        if hasattr(self.client, "close"):
+            self.client.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def answer_question(self, question_text, question_number=None):
         """
         Send a question to the LLM and get an answer.
         
         Args:
-            question_text: The text of the question
+            question_text: The text of the question (or a question dict with a 'text' key)
             question_number: Optional question number for context
             
         Returns:
             The LLM's answer as a string
         """
         try:
-            system_prompt = """Você responde questões do vestibular da UFRGS.
-IMPORTANTE: Responda APENAS com a letra da alternativa correta (A, B, C, D ou E).
-NÃO forneça explicações, justificativas ou texto adicional.
-Responda somente: A, B, C, D ou E."""
-
-            user_prompt = f"{question_text}"
-            
-            if self.provider == "openai":
-                return self._answer_openai(system_prompt, user_prompt)
-            elif self.provider == "gemini":
-                return self._answer_gemini(system_prompt, user_prompt)
-            elif self.provider == "groq":
-                return self._answer_groq(system_prompt, user_prompt)
-            elif self.provider == "anthropic":
-                return self._answer_anthropic(system_prompt, user_prompt)
-            elif self.provider == "ollama":
-                return self._answer_ollama(system_prompt, user_prompt)
+            user_prompt = self._question_text(question_text)
+            return self._request(SYSTEM_PROMPT, user_prompt, ANSWER_MAX_TOKENS)
                 
         except Exception as e:
             return f"Error getting answer: {str(e)}"
     
-    def _answer_openai(self, system_prompt, user_prompt):
+    def answer_question_batch(self, questions):
+        """
+        Send several questions to the LLM in a single request.
+        
+        Completion models (COMPLETION_MODELS) get one prompt per question in
+        a prompt-list request; chat models get all questions in one prompt.
+        Questions whose answer can't be read from the response are sent
+        again one by one with answer_question.
+        
+        Args:
+            questions: List of question texts (or question dicts with a 'text' key)
+            
+        Returns:
+            List of answers, in the same order as questions
+        """
+        texts = [self._question_text(q) for q in questions]
+        if self._uses_prompt_list():
+            try:
+                return self._request_many(SYSTEM_PROMPT, texts)
+            except Exception as e:
+                return [f"Error getting answer: {str(e)}"] * len(texts)
+        
+        user_prompt = "\n\n".join(f"Q{idx}: {text}" for idx, text in enumerate(texts, 1))
+        
+        parsed = {}
+        try:
+            max_tokens = BATCH_MAX_TOKENS_PER_QUESTION * len(texts) + ANSWER_MAX_TOKENS
+            response = self._request(BATCH_SYSTEM_PROMPT, user_prompt, max_tokens)
+            # Models often wrap the JSON in a code block or add text around it
+            start, end = response.find("{"), response.rfind("}")
+            if start != -1 and end > start:
+                parsed = json.loads(response[start:end + 1])
+        except Exception:
+            parsed = {}
+        
+        answers = []
+        for idx, question in enumerate(questions, 1):
+            answer = parsed.get(str(idx)) if isinstance(parsed, dict) else None
+            if isinstance(answer, str) and answer.strip():
+                answers.append(answer.strip())
+            else:
+                answers.append(self.answer_question(question))
+        
+        return answers
+    
+    def _request(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
+        """
+        Get the response for a prompt, going through self.cache when one is set.
+        
+        Error responses are not cached.
+        """
+        if self.cache is None:
+            return self._complete_with_retry(system_prompt, user_prompt, max_tokens)
+        
+        key = self.cache.make_key(self.provider, self.model, system_prompt, user_prompt, self.temperature)
+        response = self.cache.get(key)
+        with self._stats_lock:
+            self.stats["hits" if response is not None else "misses"] += 1
+        if response is not None:
+            return response
+        
+        response = self._complete_with_retry(system_prompt, user_prompt, max_tokens)
+        if not response.startswith("Error"):
+            self.cache.set(key, response)
+        return response
+    
+    def _request_many(self, system_prompt, user_prompts):
+        """
+        Get the responses for several prompts with one prompt-list request.
+        
+        Prompts found in self.cache are not sent.
+        """
+        keys = [self.cache.make_key(self.provider, self.model, system_prompt, user_prompt, self.temperature)
+                for user_prompt in user_prompts] if self.cache is not None else None
+        responses = [self.cache.get(key) for key in keys] if keys else [None] * len(user_prompts)
+        
+        missing = [idx for idx, response in enumerate(responses) if response is None]
+        if self.cache is not None:
+            with self._stats_lock:
+                self.stats["hits"] += len(user_prompts) - len(missing)
+                self.stats["misses"] += len(missing)
+        
+        if missing:
+            fresh = self._with_retry(
+                self._answer_openai_batch, system_prompt, [user_prompts[idx] for idx in missing]
+            )
+            for idx, response in zip(missing, fresh):
+                responses[idx] = response
+                if keys:
+                    self.cache.set(keys[idx], response)
+        
+        return responses
+    
+    def _uses_prompt_list(self):
+        """Whether the model accepts a list of prompts per request."""
+        return self.provider == "openai" and self.model.startswith(COMPLETION_MODELS)
+    
+    def _complete_with_retry(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
+        """Call _complete, retrying failures with exponential backoff."""
+        return self._with_retry(self._complete, system_prompt, user_prompt, max_tokens)
+    
+    def _with_retry(self, func, *args):
+        """
+        Call func(*args), retrying failures with exponential backoff.
+        
+        Rate limit and transient network errors are common when many requests
+        are in flight; this runs on a worker thread in the async path, so the
+        wait doesn't block other questions. Only errors for which a retry can
+        help are retried (see _is_retryable); anything else is raised at once.
+        The SDK clients are created with max_retries=0 so their own retries
+        don't multiply these.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+                time.sleep(2 ** attempt)
+    
+    @staticmethod
+    def _is_retryable(error):
+        """Whether error is a rate limit, timeout, connection or server error."""
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is None and isinstance(getattr(error, "code", None), int):
+            # google.api_core exceptions carry the HTTP status as code
+            status = error.code
+        if isinstance(status, int):
+            return status in RETRYABLE_STATUS or status >= 500
+        
+        return (isinstance(error, (TimeoutError, ConnectionError))
+                or type(error).__name__ in RETRYABLE_ERRORS)
+    
+    def _complete(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
+        """Send a system + user prompt to the configured provider."""
+        if self.provider == "openai" and self._uses_prompt_list():
+            return self._answer_openai_batch(system_prompt, [user_prompt])[0]
+        elif self.provider == "openai":
+            return self._answer_openai(system_prompt, user_prompt, max_tokens)
+        elif self.provider == "gemini":
+            return self._answer_gemini(system_prompt, user_prompt, max_tokens)
+        elif self.provider == "groq":
+            return self._answer_groq(system_prompt, user_prompt, max_tokens)
+        elif self.provider == "anthropic":
+            return self._answer_anthropic(system_prompt, user_prompt, max_tokens)
+        elif self.provider == "ollama":
+            return self._answer_ollama(system_prompt, user_prompt, max_tokens)
+    
+    def _answer_openai(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
         """Get answer from OpenAI."""
+        constraints = {}
+        if system_prompt == SYSTEM_PROMPT and self._letter_bias:
+            # Single answer: the first token is forced to be a letter, nothing else is needed
+            constraints = {"logit_bias": self._letter_bias}
+            max_tokens = 1
+        
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.3,
-            max_tokens=1000
+            temperature=self.temperature,
+            max_tokens=max_tokens,
+            **constraints
         )
         answer = response.choices[0].message.content
         return answer.strip() if answer else "No answer provided"
     
-    def _answer_gemini(self, system_prompt, user_prompt):
+    def _answer_openai_batch(self, system_prompt, user_prompts):
+        """
+        Get answers for several prompts from one OpenAI completions request.
+        
+        The choices aren't guaranteed to come back in prompt order, so they
+        are put back in order by their index.
+        """
+        constraints = {"logit_bias": self._letter_bias} if self._letter_bias else {}
+        response = self.client.completions.create(
+            model=self.model,
+            prompt=[f"{system_prompt}\n\n{user_prompt}\n\nResposta:" for user_prompt in user_prompts],
+            temperature=self.temperature,
+            max_tokens=1 if constraints else ANSWER_MAX_TOKENS,
+            **constraints
+        )
+        answers = [None] * len(user_prompts)
+        for choice in response.choices:
+            answers[choice.index] = choice.text.strip() or "No answer provided"
+        return [answer or "No answer provided" for answer in answers]
+    
+    def _answer_gemini(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
         """Get answer from Google Gemini."""
+        import google.generativeai as genai
         full_prompt = f"{system_prompt}\n\n{user_prompt}"
+        generation_config = genai.types.GenerationConfig(
+            max_output_tokens=max_tokens, temperature=self.temperature
+        )
         try:
-            response = self.client.generate_content(full_prompt)
-            return response.text.strip() if hasattr(response, 'text') and response.text else "No answer provided"
+            response = self.client.generate_content(full_prompt, generation_config=generation_config)
         except Exception as e:
-            # Try alternative prompt format
+            if self._is_retryable(e):
+                raise
+            # Try alternative prompt format; if it fails too, the original
+            # error is raised for the caller (and _with_retry) to handle
             try:
-                response = self.client.generate_content([full_prompt])
-                return response.text.strip() if hasattr(response, 'text') and response.text else "No answer provided"
-            except:
-                return f"Error: {str(e)}"
+                response = self.client.generate_content([full_prompt], generation_config=generation_config)
+            except Exception:
+                raise e
+        return response.text.strip() if hasattr(response, 'text') and response.text else "No answer provided"
     
-    def _answer_groq(self, system_prompt, user_prompt):
+    def _answer_groq(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
         """Get answer from Groq."""
         response = self.client.chat.completions.create(
             model=self.model,
@@ -150,18 +459,20 @@ Responda somente: A, B, C, D ou E."""
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.3,
-            max_tokens=1000
+            temperature=self.temperature,
+            max_tokens=max_tokens
         )
         answer = response.choices[0].message.content
         return answer.strip() if answer else "No answer provided"
     
-    def _answer_anthropic(self, system_prompt, user_prompt):
+    def _answer_anthropic(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
         """Get answer from Anthropic Claude."""
         response = self.client.messages.create(
             model=self.model,
-            max_tokens=1000,
-            system=system_prompt,
+            max_tokens=max_tokens,
+            system=[
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ],
             messages=[
                 {"role": "user", "content": user_prompt}
             ]
@@ -169,90 +480,332 @@ Responda somente: A, B, C, D ou E."""
         answer = response.content[0].text
         return answer.strip() if answer else "No answer provided"
     
-    def _answer_ollama(self, system_prompt, user_prompt):
+    def _answer_ollama(self, system_prompt, user_prompt, max_tokens=ANSWER_MAX_TOKENS):
         """Get answer from Ollama (local)."""
-        import requests
-        
         url = f"{self.base_url}/api/generate"
         payload = {
             "model": self.model,
             "prompt": f"{system_prompt}\n\n{user_prompt}",
-            "stream": False
+            "stream": False,
+            "options": {"num_predict": max_tokens}
         }
+        if system_prompt == SYSTEM_PROMPT:
+            # Single answer: structured output restricts it to one of the letters.
+            # The JSON wrapper takes a few more tokens than the bare letter
+            payload["format"] = OLLAMA_ANSWER_FORMAT
+            payload["options"]["num_predict"] = max_tokens + 10
         
-        response = requests.post(url, json=payload)
+        response = self._http.post(url, json=payload)
         response.raise_for_status()
         result = response.json()
-        return result.get("response", "No answer provided").strip()
+        answer = result.get("response", "No answer provided").strip()
+        
+        if "format" in payload:
+            try:
+                return json.loads(answer)["answer"]
+            except (ValueError, KeyError, TypeError):
+                pass
+        return answer
     
-    def answer_multiple_questions(self, questions):
+    async def aanswer_question(self, question_text, question_number=None, executor=None):
         """
-        Answer multiple questions and return a dictionary of results.
+        Async variant of answer_question.
+        
+        The provider SDKs are blocking, so the request runs on a worker thread
+        and the event loop is free to dispatch other questions meanwhile.
+        
+        Args:
+            question_text: The text of the question
+            question_number: Optional question number for context
+            executor: Optional executor to run the blocking call on
+            
+        Returns:
+            The LLM's answer as a string
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, self.answer_question, question_text, question_number
+        )
+    
+    @staticmethod
+    def _question_text(question):
+        """Return the text of a question dict (as from pdf_parser) or plain string."""
+        return question['text'] if isinstance(question, dict) else question
+    
+    @staticmethod
+    def _question_items(questions):
+        """List (question ID, question, question number) for a list or dict of questions."""
+        if isinstance(questions, list):
+            return [(f"question_{idx}", question, idx) for idx, question in enumerate(questions, 1)]
+        elif isinstance(questions, dict):
+            return [(q_id, question, q_id) for q_id, question in questions.items()]
+        return []
+    
+    @staticmethod
+    def _consensus(votes, threshold):
+        """
+        Return the answer most of votes agree on, or None below threshold.
+        
+        Error answers don't count as votes.
+        """
+        votes = [vote.strip().upper() for vote in votes if vote and not vote.startswith("Error")]
+        if len(votes) < CONSENSUS_MIN_VOTES:
+            return None
+        answer, count = Counter(votes).most_common(1)[0]
+        return answer if count / len(votes) >= threshold else None
+    
+    async def answer_multiple_questions_async(self, questions, batch_size=1, concurrency=None,
+                                              prior_answers=None, consensus_threshold=0.8):
+        """
+        Answer multiple questions concurrently and return a dictionary of results.
+        
+        At most self.concurrency requests are in flight at the same time.
+        Questions with the same text are sent only once.
         
         Args:
             questions: List of question texts or dict with question numbers as keys
+            batch_size: Number of questions sent per request (see answer_question_batch)
+            concurrency: Overrides self.concurrency for this call
+            prior_answers: Optional dict mapping question IDs to the answers other
+                LLMs gave; questions they agree on are not sent to this LLM
+            consensus_threshold: Fraction of prior answers that must agree
+                for their answer to be reused
             
         Returns:
-            Dictionary mapping question IDs to answers
+            Dictionary mapping question IDs to answers (in input order); reused
+            answers are tagged with "source": "consensus"
         """
-        answers = {}
+        items = self._question_items(questions)
+        if not items:
+            return {}
         
-        if isinstance(questions, list):
-            for idx, question in enumerate(questions, 1):
-                print(f"Processing question {idx}/{len(questions)}...")
-                answer = self.answer_question(question, question_number=idx)
-                answers[f"question_{idx}"] = {
+        consensus = {}
+        if prior_answers:
+            for q_id, _, _ in items:
+                answer = self._consensus(prior_answers.get(q_id, ()), consensus_threshold)
+                if answer is not None:
+                    consensus[q_id] = answer
+            if consensus:
+                print(f"Consensus: {len(consensus)} questions answered from prior LLMs")
+        
+        all_items = items
+        
+        # Identical questions are only sent once; the answer is copied to the repeats
+        unique = {}
+        sent_as = {}
+        for item in items:
+            if item[0] not in consensus:
+                sent_as[item[0]] = unique.setdefault(self._question_text(item[1]), item)[0]
+        items = list(unique.values())
+        if len(items) < len(sent_as):
+            print(f"Skipping {len(sent_as) - len(items)} duplicate questions")
+        
+        total = len(items)
+        batch_size = max(1, batch_size)
+        concurrency = concurrency or self.concurrency
+        if self.provider == "ollama":
+            self._size_http_pool(concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        
+        # A single progress bar, updated as answers arrive; plain messages without tqdm
+        progress = tqdm(total=total, desc="Questions", unit="q") if tqdm is not None and total else None
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            async def _answer(start, batch):
+                async with semaphore:
+                    if progress is None:
+                        if len(batch) == 1:
+                            print(f"Processing question {start}/{total}...")
+                        else:
+                            print(f"Processing questions {start}-{start + len(batch) - 1}/{total}...")
+                    
+                    if len(batch) == 1:
+                        _, question, question_number = batch[0]
+                        answers = [await self.aanswer_question(question, question_number, executor)]
+                    else:
+                        answers = await loop.run_in_executor(
+                            executor, self.answer_question_batch, [question for _, question, _ in batch]
+                        )
+                    
+                    if progress is not None:
+                        progress.update(len(batch))
+                    return answers
+            
+            try:
+                batches = await asyncio.gather(*(
+                    _answer(start + 1, items[start:start + batch_size])
+                    for start in range(0, total, batch_size)
+                ))
+            finally:
+                if progress is not None:
+                    progress.close()
+        
+        results = dict(zip((q_id for q_id, _, _ in items), (answer for batch in batches for answer in batch)))
+        
+        answers = {}
+        for q_id, question, _ in all_items:
+            if q_id in consensus:
+                answers[q_id] = {
                     "question": question,
-                    "answer": answer
+                    "answer": consensus[q_id],
+                    "source": "consensus"
                 }
-        elif isinstance(questions, dict):
-            total = len(questions)
-            for idx, (q_id, question) in enumerate(questions.items(), 1):
-                print(f"Processing question {idx}/{total}...")
-                answer = self.answer_question(question, question_number=q_id)
+            else:
                 answers[q_id] = {
                     "question": question,
-                    "answer": answer
+                    "answer": results[sent_as[q_id]]
                 }
         
         return answers
-
-
-# Provider information for users
-PROVIDER_INFO = {
-    "openai": {
-        "name": "OpenAI",
-        "models": ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"],
-        "free": False,
-        "api_key_url": "https://platform.openai.com/api-keys",
-        "notes": "Most reliable, moderate cost"
-    },
-    "gemini": {
-        "name": "Google Gemini",
-        "models": ["gemini-1.5-flash", "gemini-1.5-pro"],
-        "free": True,
-        "api_key_url": "https://makersuite.google.com/app/apikey",
-        "notes": "FREE tier available! Fast and good quality"
-    },
-    "groq": {
-        "name": "Groq",
-        "models": ["llama-3.1-70b-versatile", "mixtral-8x7b-32768"],
-        "free": True,
-        "api_key_url": "https://console.groq.com/keys",
-        "notes": "FREE! Very fast, good for testing"
-    },
-    "anthropic": {
-        "name": "Anthropic Claude",
-        "models": ["claude-3-5-sonnet-20241022", "claude-3-haiku-20240307"],
-        "free": False,
-        "api_key_url": "https://console.anthropic.com/",
-        "notes": "High quality, moderate cost"
-    },
-    "ollama": {
-        "name": "Ollama (Local)",
-        "models": ["llama3.2", "llama3.1", "mistral", "gemma2"],
-        "free": True,
-        "api_key_url": "Not needed - runs locally",
-        "notes": "100% FREE! Runs on your computer. Install from https://ollama.com"
-    }
-}
+    
+    def answer_multiple_questions(self, questions, batch_size=1, concurrency=None,
+                                  prior_answers=None, consensus_threshold=0.8):
+        """
+        Answer multiple questions and return a dictionary of results.
+        
+        Synchronous wrapper around answer_multiple_questions_async.
+        
+        Args:
+            questions: List of question texts or dict with question numbers as keys
+            batch_size: Number of questions sent per request (see answer_question_batch)
+            concurrency: Overrides self.concurrency for this call
+            prior_answers: Optional dict mapping question IDs to the answers other
+                LLMs gave; questions they agree on are not sent to this LLM
+            consensus_threshold: Fraction of prior answers that must agree
+                for their answer to be reused
+            
+        Returns:
+            Dictionary mapping question IDs to answers
+        """
+        return run_sync(self.answer_multiple_questions_async(
+            questions, batch_size, concurrency,
+            prior_answers=prior_answers, consensus_threshold=consensus_threshold
+        ))
+    
+    def submit_batch(self, questions):
+        """
+        Submit questions to the provider's batch API (OpenAI and Anthropic only).
+        
+        Batches cost half as much as regular requests but are answered
+        asynchronously, usually within minutes and at most in 24 hours. Use
+        them for offline evaluation runs; answer_multiple_questions is the
+        way to go when the answers are needed right away.
+        
+        Args:
+            questions: List of question texts or dict with question numbers as keys
+            
+        Returns:
+            The batch ID, to be passed to poll_batch
+        """
+        items = self._question_items(questions)
+        if not items:
+            raise ValueError("No questions to submit.")
+        
+        if self.provider == "openai":
+            lines = []
+            for q_id, question, _ in items:
+                request = {
+                    "custom_id": str(q_id),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.model,
+                        "messages": [
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": self._question_text(question)}
+                        ],
+                        "temperature": self.temperature,
+                        "max_tokens": ANSWER_MAX_TOKENS
+                    }
+                }
+                lines.append(json.dumps(request, ensure_ascii=False))
+            
+            batch_file = self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode('utf-8')),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            return batch.id
+        
+        elif self.provider == "anthropic":
+            batch_requests = [
+                {
+                    "custom_id": str(q_id),
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": ANSWER_MAX_TOKENS,
+                        "system": [
+                            {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+                        ],
+                        "messages": [
+                            {"role": "user", "content": self._question_text(question)}
+                        ]
+                    }
+                }
+                for q_id, question, _ in items
+            ]
+            batch = self.client.messages.batches.create(requests=batch_requests)
+            return batch.id
+        
+        raise ValueError(f"Batch API not supported for provider: {self.provider}. Supported: openai, anthropic")
+    
+    def poll_batch(self, batch_id, interval=60):
+        """
+        Wait for a batch submitted with submit_batch and collect its answers.
+        
+        Args:
+            batch_id: ID returned by submit_batch
+            interval: Seconds between status checks
+            
+        Returns:
+            Dictionary mapping question IDs (as strings) to answers
+        """
+        answers = {}
+        
+        if self.provider == "openai":
+            batch = self.client.batches.retrieve(batch_id)
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(interval)
+                batch = self.client.batches.retrieve(batch_id)
+            
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch_id} {batch.status}")
+            
+            # Requests that failed are listed in a separate error file
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    response = result.get("response") or {}
+                    if response.get("status_code") == 200:
+                        answer = response["body"]["choices"][0]["message"]["content"]
+                        answers[result["custom_id"]] = answer.strip() if answer else "No answer provided"
+                    else:
+                        error = result.get("error") or response.get("body")
+                        answers[result["custom_id"]] = f"Error getting answer: {error}"
+        
+        elif self.provider == "anthropic":
+            batch = self.client.messages.batches.retrieve(batch_id)
+            while batch.processing_status != "ended":
+                time.sleep(interval)
+                batch = self.client.messages.batches.retrieve(batch_id)
+            
+            for result in self.client.messages.batches.results(batch_id):
+                if result.result.type == "succeeded":
+                    answer = result.result.message.content[0].text
+                    answers[result.custom_id] = answer.strip() if answer else "No answer provided"
+                else:
+                    answers[result.custom_id] = f"Error getting answer: {result.result.type}"
+        
+        else:
+            raise ValueError(f"Batch API not supported for provider: {self.provider}. Supported: openai, anthropic")
+        
+        return answers
@@ -6,8 +6,7 @@ Main entry point for the application.
 
 import os
 import sys
-from pipeline import process_test
-from llm_client import PROVIDER_INFO
+from providers import PROVIDER_INFO, get_env
 
 
 def print_provider_info():
@@ -64,7 +63,7 @@ def main():
     api_key = None
     if provider != "ollama":
         env_key_name = f"{provider.upper()}_API_KEY"
-        api_key = os.getenv(env_key_name)
+        api_key = get_env(env_key_name)
         
         if not api_key:
             print(f"\n⚠️  No {env_key_name} found in environment.")
@@ -136,6 +135,9 @@ def main():
     
     print()
     
+    # Imported here so the menu shows up without loading the PDF parser and LLM client
+    from pipeline import process_test
+    
     # Process the test
     result = process_test(
         pdf_path=pdf_path,
@@ -1,19 +1,139 @@
-import json
+import asyncio
 import os
 from pdf_parser import extract_questions_from_pdf
-from llm_client import LLMClient, PROVIDER_INFO
+from cache import SemanticCache, SentenceTransformerEmbedder
+from utils import count_tokens_estimate_bulk, dumps_json, max_prefix_within, run_sync
 
 
-def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, model=None):
+# Prompt budget for one batch of questions, well below every provider's context window
+MAX_BATCH_TOKENS = 6000
+MAX_BATCH_SIZE = 10
+
+
+def _question_text(question):
+    """Return the text of a question as extracted by pdf_parser (dict) or given directly (str)."""
+    if isinstance(question, dict):
+        return question.get('text', '')
+    return question
+
+
+def choose_batch_size(questions, max_tokens=MAX_BATCH_TOKENS, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Choose how many questions to pack into a single LLM request.
+    
+    Args:
+        questions: Dict mapping question IDs to questions
+        max_tokens: Token budget for the questions of one batch
+        max_batch_size: Upper bound for the batch size
+        
+    Returns:
+        Number of questions per request (at least 1)
+    """
+    if not questions:
+        return 1
+    
+    # Size batches for the longest questions, so that every batch fits the budget
+    token_counts = count_tokens_estimate_bulk(_question_text(q) for q in questions.values())
+    token_counts.sort()
+    token_counts = token_counts[::-1]
+    return max(1, min(max_batch_size, max_prefix_within(token_counts, max_tokens)))
+
+
+def _write_json(data, file_path):
+    """Serialize data and write it to file_path (blocking)."""
+    with open(file_path, 'wb') as json_file:
+        json_file.write(dumps_json(data))
+
+
+async def _answer_with_cache(llm_client, questions, cache, batch_size=1):
+    """
+    Answer questions, only sending cache misses to the LLM.
+    
+    Args:
+        llm_client: Initialized LLMClient
+        questions: Dict mapping question IDs to questions
+        cache: SemanticCache instance
+        batch_size: Number of questions sent per request
+        
+    Returns:
+        Dictionary mapping question IDs to answers (in input order)
+    """
+    cached = {}
+    misses = {}
+    for q_id, question in questions.items():
+        answer = cache.get(_question_text(question))
+        if answer is None:
+            misses[q_id] = question
+        else:
+            cached[q_id] = {
+                "question": question,
+                "answer": answer
+            }
+    
+    print(f"Cache: {len(cached)} hits, {len(misses)} misses")
+    
+    fresh = await llm_client.answer_multiple_questions_async(misses, batch_size) if misses else {}
+    for q_id, result in fresh.items():
+        # Never persist failures, they should be retried on the next run
+        if not result["answer"].startswith("Error"):
+            cache.set(_question_text(result["question"]), result["answer"])
+    
+    return {q_id: cached[q_id] if q_id in cached else fresh[q_id] for q_id in questions}
+
+
+def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, model=None,
+                 concurrency=None, use_cache=True, batch_size=None, semantic_model=None,
+                 near_duplicates=False):
     """
     Main pipeline to process a UFRGS vestibular test PDF and generate answers using LLM.
     
+    Synchronous wrapper around process_test_async.
+    
+    Args:
+        pdf_path: Path to the input PDF file
+        output_json_path: Path to save the output JSON file with answers
+        provider: LLM provider to use (default: gemini)
+        api_key: API key for the provider (optional, can be set via environment variable)
+        model: LLM model to use (optional, uses provider default)
+        concurrency: Maximum number of concurrent LLM requests (optional, uses provider default)
+        use_cache: Reuse answers cached by previous runs (default: True)
+        batch_size: Questions sent per LLM request (optional, chosen from question length;
+            1 sends every question on its own)
+        semantic_model: sentence-transformers model for near-duplicate cache lookups
+            (optional, implies near_duplicates; character trigrams are used by default)
+        near_duplicates: Also reuse cached answers of near-duplicate questions
+            (default: False, only exact matches)
+        
+    Returns:
+        Dictionary with the results
+    """
+    return run_sync(process_test_async(
+        pdf_path, output_json_path, provider=provider, api_key=api_key, model=model,
+        concurrency=concurrency, use_cache=use_cache, batch_size=batch_size,
+        semantic_model=semantic_model, near_duplicates=near_duplicates
+    ))
+
+
+async def process_test_async(pdf_path, output_json_path, provider="gemini", api_key=None,
+                             model=None, concurrency=None, use_cache=True, batch_size=None,
+                             semantic_model=None, near_duplicates=False):
+    """
+    Async pipeline: questions are sent to the LLM concurrently instead of one by one.
+    
     Args:
         pdf_path: Path to the input PDF file
         output_json_path: Path to save the output JSON file with answers
         provider: LLM provider to use (default: gemini)
         api_key: API key for the provider (optional, can be set via environment variable)
         model: LLM model to use (optional, uses provider default)
+        concurrency: Maximum number of concurrent LLM requests (optional, uses provider default)
+        use_cache: Reuse answers cached by previous runs (default: True)
+        batch_size: Questions sent per LLM request (optional, chosen from question length;
+            1 sends every question on its own)
+        semantic_model: sentence-transformers model for near-duplicate cache lookups
+            (optional, implies near_duplicates; character trigrams are used by default)
+        near_duplicates: Also reuse cached answers of near-duplicate questions
+            (default: False, only exact matches)
         
     Returns:
         Dictionary with the results
@@ -33,8 +153,13 @@ def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, mo
     
     # Step 2: Initialize LLM client
     print(f"Step 2: Initializing {provider.upper()} client...")
+    
+    # Imported here so the provider SDK is only loaded once it's actually needed
+    from llm_client import LLMClient
+    
     try:
-        llm_client = LLMClient(provider=provider, api_key=api_key, model=model)
+        llm_client = LLMClient(provider=provider, api_key=api_key, model=model,
+                               concurrency=concurrency)
         print(f"Using model: {llm_client.model}")
     except ValueError as e:
         print(f"Error initializing LLM client: {e}")
@@ -42,7 +167,23 @@ def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, mo
     
     # Step 3: Get answers from LLM
     print("Step 3: Getting answers from LLM...")
-    answers = llm_client.answer_multiple_questions(questions)
+    batch_size = batch_size or choose_batch_size(questions)
+    print(f"Sending up to {batch_size} questions per request")
+    with llm_client:
+        if use_cache:
+            embedder = SentenceTransformerEmbedder(semantic_model) if semantic_model else None
+            # Answers are sampled (temperature > 0): a cached letter is one sample, replayed
+            # on later runs (--no-cache samples again). Keep samples of different
+            # temperatures apart
+            namespace = f"{provider}:{llm_client.model}:t{llm_client.temperature}"
+            cache = SemanticCache(namespace=namespace, embedder=embedder,
+                                  near_duplicates=near_duplicates or embedder is not None)
+            try:
+                answers = await _answer_with_cache(llm_client, questions, cache, batch_size)
+            finally:
+                cache.close()
+        else:
+            answers = await llm_client.answer_multiple_questions_async(questions, batch_size)
     
     # Step 4: Prepare output structure
     output = {
@@ -58,8 +199,9 @@ def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, mo
     # Step 5: Save to JSON file
     print(f"Step 4: Saving results to {output_json_path}...")
     try:
-        with open(output_json_path, 'w', encoding='utf-8') as json_file:
-            json.dump(output, json_file, ensure_ascii=False, indent=2)
+        # Serialize and write on a worker thread so the event loop isn't blocked
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _write_json, output, output_json_path)
         print(f"Successfully saved answers to {output_json_path}")
     except Exception as e:
         print(f"Error saving JSON file: {e}")
@@ -68,6 +210,72 @@ def process_test(pdf_path, output_json_path, provider="gemini", api_key=None, mo
     return output
 
 
+
+def run_all_providers(questions, provider_configs, output_json_path=None, batch_size=None):
+    """
+    Answer the same questions with several LLMs at the same time.
+    
+    Synchronous wrapper around run_all_providers_async.
+    
+    Args:
+        questions: Dict mapping question IDs to questions
+        provider_configs: List of LLMClient keyword arguments, one per LLM
+            (e.g. [{"provider": "groq"}, {"provider": "openai", "model": "gpt-4o"}])
+        output_json_path: Where to save the results every time an LLM finishes (optional)
+        batch_size: Questions sent per LLM request (optional, chosen from question length)
+        
+    Returns:
+        Dictionary mapping "provider:model" to that LLM's answers
+    """
+    return run_sync(run_all_providers_async(
+        questions, provider_configs, output_json_path=output_json_path, batch_size=batch_size
+    ))
+
+
+async def run_all_providers_async(questions, provider_configs, output_json_path=None, batch_size=None):
+    """
+    Async variant of run_all_providers.
+    
+    Each provider has its own rate limits and its own client, so running them
+    side by side takes as long as the slowest one instead of the sum of all.
+    An LLM that fails is reported and left out; the others are still saved.
+    
+    Args:
+        questions: Dict mapping question IDs to questions
+        provider_configs: List of LLMClient keyword arguments, one per LLM
+        output_json_path: Where to save the results every time an LLM finishes (optional)
+        batch_size: Questions sent per LLM request (optional, chosen from question length)
+        
+    Returns:
+        Dictionary mapping "provider:model" to that LLM's answers
+    """
+    from llm_client import LLMClient
+    
+    batch_size = batch_size or choose_batch_size(questions)
+    loop = asyncio.get_running_loop()
+    
+    async def _run(config):
+        llm_client = LLMClient(**config)
+        label = f"{llm_client.provider}:{llm_client.model}"
+        with llm_client:
+            return label, await llm_client.answer_multiple_questions_async(questions, batch_size)
+    
+    results = {}
+    for task in asyncio.as_completed([_run(config) for config in provider_configs]):
+        try:
+            label, answers = await task
+        except Exception as e:
+            print(f"Error running LLM: {e}")
+            continue
+        
+        results[label] = answers
+        print(f"Finished {label}")
+        if output_json_path:
+            await loop.run_in_executor(None, _write_json, results, output_json_path)
+    
+    return results
+
+
 if __name__ == "__main__":
     import argparse
     
@@ -103,6 +311,37 @@ if __name__ == "__main__":
         default=None,
         help='Specific model to use (optional, uses provider default)'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=None,
+        help='Maximum number of concurrent LLM requests (optional, uses provider default)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=None,
+        help='Questions sent per LLM request (optional, chosen from question length; 1 disables batching)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Ignore answers cached by previous runs and query the LLM for every question'
+    )
+    parser.add_argument(
+        '--near-duplicates',
+        action='store_true',
+        help='Also reuse cached answers of near-duplicate questions (off by default: a small '
+             'edit can change the right letter, so only exact matches are reused)'
+    )
+    parser.add_argument(
+        '--semantic-model',
+        type=str,
+        default=None,
+        help='sentence-transformers model used to match near-duplicate questions in the cache; '
+             'implies --near-duplicates (optional, e.g. sentence-transformers/all-MiniLM-L6-v2; '
+             'defaults to character trigrams)'
+    )
     
     args = parser.parse_args()
     
@@ -117,7 +356,12 @@ if __name__ == "__main__":
         output_json_path=args.output_json,
         provider=args.provider,
         api_key=args.api_key,
-        model=args.model
+        model=args.model,
+        concurrency=args.concurrency,
+        use_cache=not args.no_cache,
+        batch_size=args.batch_size,
+        semantic_model=args.semantic_model,
+        near_duplicates=args.near_duplicates
     )
     
     if result:
@@ -0,0 +1,73 @@
+"""
+Information about the supported LLM providers.
+
+Kept free of heavy imports so the interactive menu can show it without
+loading the PDF parser or any provider SDK.
+"""
+
+import os
+
+_dotenv_loaded = False
+
+# Provider information for users
+PROVIDER_INFO = {
+    "openai": {
+        "name": "OpenAI",
+        "models": ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"],
+        "free": False,
+        "api_key_url": "https://platform.openai.com/api-keys",
+        "notes": "Most reliable, moderate cost"
+    },
+    "gemini": {
+        "name": "Google Gemini",
+        "models": ["gemini-1.5-flash", "gemini-1.5-pro"],
+        "free": True,
+        "api_key_url": "https://makersuite.google.com/app/apikey",
+        "notes": "FREE tier available! Fast and good quality"
+    },
+    "groq": {
+        "name": "Groq",
+        "models": ["llama-3.1-70b-versatile", "mixtral-8x7b-32768"],
+        "free": True,
+        "api_key_url": "https://console.groq.com/keys",
+        "notes": "FREE! Very fast, good for testing"
+    },
+    "anthropic": {
+        "name": "Anthropic Claude",
+        "models": ["claude-3-5-sonnet-20241022", "claude-3-haiku-20240307"],
+        "free": False,
+        "api_key_url": "https://console.anthropic.com/",
+        "notes": "High quality, moderate cost"
+    },
+    "ollama": {
+        "name": "Ollama (Local)",
+        "models": ["llama3.2", "llama3.1", "mistral", "gemma2"],
+        "free": True,
+        "api_key_url": "Not needed - runs locally",
+        "notes": "100% FREE! Runs on your computer. Install from https://ollama.com"
+    }
+}
+
+
+def get_env(name, default=None):
+    """
+    Read an environment variable, falling back to the .env file.
+    
+    The .env file is only read (once) the first time a variable isn't
+    already set, so nothing is loaded when keys come from the environment.
+    
+    Args:
+        name: Name of the variable
+        default: Value returned when it isn't set anywhere
+        
+    Returns:
+        The value of the variable, or default
+    """
+    global _dotenv_loaded
+    value = os.getenv(name)
+    if value is None and not _dotenv_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _dotenv_loaded = True
+        value = os.getenv(name)
+    return value if value is not None else default
@@ -2,9 +2,20 @@
 Utility functions for UFRGS Vestibular Test LLM Processor
 """
 
+import asyncio
 import json
 import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def format_json_output(data, indent=2):
@@ -18,9 +29,29 @@ def format_json_output(data, indent=2):
     Returns:
         Formatted JSON string
     """
+    if indent == 2:
+        # orjson only indents by two spaces, the default
+        return dumps_json(data).decode('utf-8')
     return json.dumps(data, indent=indent, ensure_ascii=False)
 
 
+def dumps_json(data):
+    """
+    Serialize data as pretty-printed UTF-8 JSON (2-space indent).
+    
+    Uses orjson when available, falling back to the standard library.
+    
+    Args:
+        data: Data to serialize
+        
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
 def handle_error(error_message):
     """
     Print error message with formatting.
@@ -41,16 +72,19 @@ def validate_pdf_file(file_path):
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not os.path.exists(file_path):
+    # A single stat() answers exists / is a file / size
+    try:
+        file_stat = os.stat(file_path)
+    except (OSError, ValueError):
         return False, f"File does not exist: {file_path}"
     
-    if not os.path.isfile(file_path):
+    if not stat.S_ISREG(file_stat.st_mode):
         return False, f"Path is not a file: {file_path}"
     
     if not file_path.lower().endswith('.pdf'):
         return False, f"File is not a PDF: {file_path}"
     
-    if os.path.getsize(file_path) == 0:
+    if file_stat.st_size == 0:
         return False, f"File is empty: {file_path}"
     
     return True, None
@@ -77,6 +111,7 @@ def ensure_output_directory(file_path):
     return True
 
 
+@lru_cache(maxsize=256)
 def generate_output_filename(input_pdf_path, suffix="_answers"):
     """
     Generate an output filename based on the input PDF name.
@@ -118,6 +153,58 @@ def count_tokens_estimate(text):
     return len(text) // 3
 
 
+def count_tokens_estimate_bulk(texts):
+    """
+    Estimate the number of tokens of many texts at once.
+    Same approximation as count_tokens_estimate.
+    
+    Args:
+        texts: Iterable of texts
+        
+    Returns:
+        NumPy array with the estimated token count of each text
+    """
+    return np.fromiter((len(t) for t in texts), dtype=np.int64) // 3
+
+
+def max_prefix_within(token_counts, limit):
+    """
+    Find how many leading items fit within a token limit.
+    
+    Args:
+        token_counts: Sequence of token counts (e.g. from count_tokens_estimate_bulk)
+        limit: Maximum total number of tokens
+        
+    Returns:
+        Largest n such that sum(token_counts[:n]) <= limit
+    """
+    cumulative = np.cumsum(token_counts)
+    return int(np.searchsorted(cumulative, limit, side='right'))
+
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    asyncio.run refuses to start inside a running event loop (e.g. in a
+    Jupyter notebook); the coroutine then gets its own loop on a worker
+    thread, blocking the caller until it finishes.
+    
+    Args:
+        coro: Coroutine to run
+        
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
 def format_progress(current, total, bar_length=50):
     """
     Create a progress bar string.
@@ -154,8 +241,8 @@ def save_json(data, file_path):
     """
     try:
         ensure_output_directory(file_path)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(file_path, 'wb') as f:
+            f.write(dumps_json(data))
         return True
     except Exception as e:
         handle_error(f"Could not save JSON file: {e}")
@@ -173,8 +260,11 @@ def load_json(file_path):
         Loaded data or None if error
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
     except Exception as e:
         handle_error(f"Could not load JSON file: {e}")
         return None
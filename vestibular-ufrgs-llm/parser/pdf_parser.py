@@ -1,6 +1,241 @@
-import pdfplumber
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import re
 
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pdfium = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+# PDF extraction backend: "pdfium" (fast, native) or "pdfplumber" (pure Python)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pdfium" if pdfium is not None else "pdfplumber").lower()
+
+# PDF opened once per worker process by _init_page_worker
+_worker_pdf = None
+
+# Day markers ("1º DIA", "2º DIA" and OCR variants)
+_DAY1_RE = re.compile(r'1.?\s*[DºªOo]\s*DIA', re.IGNORECASE)
+_DAY2_RE = re.compile(r'2.?\s*[DºªOo]\s*DIA', re.IGNORECASE)
+
+# Question number followed by its text, up to the next question number, i.e.
+# r'(\d{2,3})\.\s+(.*?)(?=\d{2,3}\.|$)' split in two lookahead-free patterns so
+# it can run on RE2 (linear time, no backtracking). The RE2 character classes
+# spell out Python's Unicode \d and \s.
+if re2 is not None:
+    _Q_START_RE = re2.compile(r'(\p{Nd}{2,3})\.[\s\x0b\x1c-\x1f\x{85}\pZ]+')
+    _Q_END_RE = re2.compile(r'\p{Nd}{2,3}\.')
+else:
+    _Q_START_RE = re.compile(r'(\d{2,3})\.\s+')
+    _Q_END_RE = re.compile(r'\d{2,3}\.')
+
+# Footer/header cleanup ("Página 3", "UFRGS 2024") in one pass
+_FOOTER_RE = re.compile(r'(?i:Página)\s+\d+|UFRGS\s+\d{4}')
+
+
+def _open_pdf(pdf_path):
+    """Open a PDF with the configured backend."""
+    if PDF_BACKEND == "pdfium":
+        if pdfium is None:
+            raise ImportError("PDF_BACKEND=pdfium requires pypdfium2. Install it with: pip install pypdfium2")
+        return pdfium.PdfDocument(pdf_path)
+    elif PDF_BACKEND == "pdfplumber":
+        # pdfminer is slow to import, only load it when it's used
+        import pdfplumber
+        return pdfplumber.open(pdf_path)
+    else:
+        raise ValueError(f"Unknown PDF backend: {PDF_BACKEND}. Supported: pdfium, pdfplumber")
+
+
+def _page_count(pdf):
+    """Number of pages of a PDF opened by _open_pdf."""
+    if PDF_BACKEND == "pdfium":
+        return len(pdf)
+    return len(pdf.pages)
+
+
+def _init_page_worker(pdf_path):
+    """Open the PDF once in each worker process."""
+    global _worker_pdf
+    _worker_pdf = _open_pdf(pdf_path)
+
+
+def _count_images_pdfium(page, max_depth=15):
+    """
+    Count the image objects of a page, including those inside Form XObjects.
+    
+    Uses the raw PDFium calls: PdfPage.get_objects wraps every object of the
+    page (mostly text) in a Python helper just to read its type.
+    """
+    count = 0
+    stack = [(pdfium_c.FPDFPage_CountObjects, pdfium_c.FPDFPage_GetObject, page.raw, 0)]
+    while stack:
+        count_objects, get_object, parent, level = stack.pop()
+        for i in range(count_objects(parent)):
+            obj = get_object(parent, i)
+            obj_type = pdfium_c.FPDFPageObj_GetType(obj)
+            if obj_type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                count += 1
+            elif obj_type == pdfium_c.FPDF_PAGEOBJ_FORM and level < max_depth - 1:
+                stack.append((pdfium_c.FPDFFormObj_CountObjects, pdfium_c.FPDFFormObj_GetObject,
+                              obj, level + 1))
+    return count
+
+
+def _extract_page_pdfium(pdf, page_num):
+    """Extract (text, image_count) from a page with pypdfium2."""
+    page = pdf[page_num - 1]
+    textpage = page.get_textpage()
+    try:
+        text = textpage.get_text_bounded()
+        image_count = _count_images_pdfium(page)
+    finally:
+        textpage.close()
+        page.close()
+    return text, image_count
+
+
+def _extract_page_pdfplumber(pdf, page_num):
+    """Extract (text, image_count) from a page with pdfplumber."""
+    page = pdf.pages[page_num - 1]
+    text = page.extract_text() or ""
+    image_count = len(page.images)
+    
+    # Drop the parsed layout, only the text is sent back
+    page.flush_cache()
+    
+    return text, image_count
+
+
+def _extract_one_page(page_num, pdf=None):
+    """
+    Extract text and image metadata from a single page.
+    
+    Runs in a worker process: pdfminer's layout analysis is pure Python and
+    holds the GIL, and PDFium is not thread-safe, so pages are spread across
+    processes rather than threads.
+    
+    Args:
+        page_num: 1-based page number
+        pdf: PDF opened by _open_pdf (defaults to the worker's _worker_pdf)
+        
+    Returns:
+        Dict with page_num, text, has_images, image_count
+    """
+    if pdf is None:
+        pdf = _worker_pdf
+    
+    if PDF_BACKEND == "pdfium":
+        text, image_count = _extract_page_pdfium(pdf, page_num)
+    else:
+        text, image_count = _extract_page_pdfplumber(pdf, page_num)
+    
+    return {
+        'page_num': page_num,
+        'text': text,
+        'has_images': image_count > 0,
+        'image_count': image_count
+    }
+
+
+def iter_pages(pdf_path, max_workers=None):
+    """
+    Extract text and image metadata from the pages of a PDF, in parallel.
+    
+    Pages are yielded one at a time, in page order, so callers can parse
+    them as they arrive instead of holding the text of the whole PDF.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        max_workers: Number of worker processes (defaults to the number of CPUs
+            for pdfplumber; PDFium runs in-process)
+        
+    Yields:
+        Dicts with page_num, text, has_images, image_count
+    """
+    # PDFium is native code and takes ~1 ms per page: starting worker
+    # processes would cost more than the extraction itself
+    if max_workers is None and PDF_BACKEND == "pdfium":
+        max_workers = 1
+    
+    pdf = _open_pdf(pdf_path)
+    try:
+        page_count = _page_count(pdf)
+        workers = min(max_workers or os.cpu_count() or 1, page_count)
+        if workers <= 1:
+            # In-process: reuse this document, the worker global is left alone
+            for page_num in range(1, page_count + 1):
+                yield _extract_one_page(page_num, pdf)
+            return
+    finally:
+        pdf.close()
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker,
+                             initargs=(pdf_path,)) as executor:
+        yield from executor.map(_extract_one_page, range(1, page_count + 1))
+
+
+def prefetch(iterable, maxsize=4):
+    """
+    Consume an iterable on a background thread, handing items over through a bounded queue.
+    
+    Lets the caller work on one item while the next ones are being produced;
+    maxsize bounds how far the producer can run ahead (and the memory used).
+    Exceptions raised by the producer are re-raised in the caller.
+    
+    Args:
+        iterable: Iterable to consume (e.g. the iter_pages generator)
+        maxsize: Maximum number of items waiting in the queue
+        
+    Yields:
+        The items of iterable, in order
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    done = object()
+    
+    def _put(item):
+        # Give up if the consumer went away, instead of blocking forever
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except BaseException as e:
+            _put((done, e))
+            return
+        _put((done, None))
+    
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
 
 def extract_questions_from_pdf(pdf_path):
     """
@@ -16,23 +251,8 @@ def extract_questions_from_pdf(pdf_path):
     questions = {}
     
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            pages_data = []
-            
-            # Extract text and images from all pages
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text() or ""
-                images = page.images
-                
-                pages_data.append({
-                    'page_num': page_num,
-                    'text': text,
-                    'has_images': len(images) > 0,
-                    'image_count': len(images)
-                })
-            
-            # Parse questions with page context
-            questions = parse_questions_with_pages(pages_data)
+        # Parse questions with page context while the next pages are extracted
+        questions = parse_questions_with_pages(prefetch(iter_pages(pdf_path)))
             
     except Exception as e:
         print(f"Error extracting questions from PDF: {e}")
@@ -41,75 +261,94 @@ def extract_questions_from_pdf(pdf_path):
     return questions
 
 
+def iter_question_matches(text):
+    r"""
+    Find (question number, raw text) pairs in a page of text.
+    
+    Equivalent to re.findall(r'(\d{2,3})\.\s+(.*?)(?=\d{2,3}\.|$)', text, re.DOTALL):
+    each question starts at a number
+    followed by ". " and ends right before the next number followed by ".".
+    
+    Args:
+        text: Text to scan
+        
+    Yields:
+        Tuples of (question number as string, raw question text)
+    """
+    pos = 0
+    while True:
+        start = _Q_START_RE.search(text, pos)
+        if start is None:
+            return
+        
+        end = _Q_END_RE.search(text, start.end())
+        if end is None:
+            # Like $ without re.MULTILINE, the last question stops before a final newline
+            stop = len(text) - 1 if text.endswith('\n') else len(text)
+            yield start.group(1), text[start.end():max(stop, start.end())]
+            return
+        
+        pos = end.start()
+        yield start.group(1), text[start.end():pos]
+
+
 def parse_questions_with_pages(pages_data):
     """
     Parse questions from pages data with image context.
     Detects day transitions based on markers like "1º DIA" and "2º DIA".
     
     Args:
-        pages_data: List of dicts with page_num, text, has_images, image_count
+        pages_data: Iterable of dicts with page_num, text, has_images, image_count
+            (e.g. the iter_pages generator)
         
     Returns:
         Dictionary mapping question IDs to question data
     """
     questions = {}
     current_day = 1
-    question_sequence = []  # Track (page, question_num, text)
+    day1_count = 0
+    day2_count = 0
     
-    # First pass: collect all questions with page info
+    # Single pass: assign unique IDs as questions are found
     for page_data in pages_data:
         text = page_data['text']
         page_num = page_data['page_num']
         
         # Check for day markers
-        if re.search(r'2.?\s*[DºªOo]\s*DIA', text, re.IGNORECASE):
+        if _DAY2_RE.search(text):
             current_day = 2
             print(f"DEBUG: Found Day 2 marker on page {page_num}")
-        elif re.search(r'1.?\s*[DºªOo]\s*DIA', text, re.IGNORECASE) and current_day == 2:
+        elif _DAY1_RE.search(text) and current_day == 2:
             # Ignore, already on day 2
             pass
         
         # Extract questions from this page
-        pattern = r'(\d{2,3})\.\s+(.*?)(?=\d{2,3}\.|$)'
-        matches = re.findall(pattern, text, re.DOTALL)
-        
-        for match in matches:
-            question_num = int(match[0])
+        for number, raw_text in iter_question_matches(text):
+            question_num = int(number)
             
             # Only valid question numbers
             if question_num < 1 or question_num > 150:
                 continue
                 
-            question_text = clean_question_text(match[1].strip())
+            question_text = clean_question_text(raw_text.strip())
             
             if question_text and len(question_text) > 15:
-                question_sequence.append({
-                    'page': page_num,
-                    'number': question_num,
+                question_id = f"day{current_day}_q{question_num:03d}"
+                
+                # Include metadata about images
+                questions[question_id] = {
                     'text': question_text,
-                    'day': current_day,
+                    'page': page_num,
                     'has_images': page_data['has_images'],
                     'image_count': page_data['image_count']
-                })
-    
-    # Second pass: assign unique IDs
-    for item in question_sequence:
-        question_id = f"day{item['day']}_q{item['number']:03d}"
-        
-        # Include metadata about images
-        question_data = {
-            'text': item['text'],
-            'page': item['page'],
-            'has_images': item['has_images'],
-            'image_count': item['image_count']
-        }
-        
-        questions[question_id] = question_data
+                }
+                
+                if current_day == 1:
+                    day1_count += 1
+                else:
+                    day2_count += 1
     
     # Summary
-    day1_count = sum(1 for q in question_sequence if q['day'] == 1)
-    day2_count = sum(1 for q in question_sequence if q['day'] == 2)
-    
     print(f"DEBUG: Found {len(questions)} total questions")
     print(f"DEBUG: Day 1: {day1_count} questions")
     print(f"DEBUG: Day 2: {day2_count} questions")
@@ -131,9 +370,8 @@ def parse_questions(text):
     """
     questions = {}
     
-    # Pattern to match question numbers
-    pattern = r'(\d{2,3})\.\s+(.*?)(?=\d{2,3}\.|$)'
-    matches = re.findall(pattern, text, re.DOTALL)
+    # Match question numbers
+    matches = iter_question_matches(text)
     
     current_day = 1
     last_question_num = 0
@@ -184,12 +422,12 @@ def clean_question_text(text):
     Returns:
         Cleaned question text
     """
-    # Replace multiple spaces/newlines with single space
-    text = re.sub(r'\s+', ' ', text)
+    # Replace multiple spaces/newlines with single space (str.split also
+    # handles Unicode whitespace such as non-breaking spaces, like \s does)
+    text = ' '.join(text.split())
     
     # Remove page numbers and common footer/header text
-    text = re.sub(r'Página\s+\d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'UFRGS\s+\d{4}', '', text)
+    text = _FOOTER_RE.sub('', text)
     
     return text.strip()
 
@@ -231,6 +469,8 @@ def extract_questions_with_context(pdf_path):
     Returns:
         Dictionary with questions and additional context
     """
+    import pdfplumber
+    
     questions_with_context = {}
     
     try:
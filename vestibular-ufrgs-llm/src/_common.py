@@ -0,0 +1,232 @@
+"""
+Funções comuns aos programas de cálculo do vestibular UFRGS.
+
+Carregamento dos arquivos JSON, mapeamento das questões por matéria e
+contagem de acertos de cada LLM.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Nomes das matérias em info.json -> chaves usadas no mapeamento
+MATERIA_CANON = {
+    'Lingua Portuguesa': 'portugues',
+    'Literatura': 'literatura',
+    'Matematica': 'matematica',
+    'Geografia': 'geografia',
+    'Historia': 'historia',
+    'Fisica': 'fisica',
+    'Quimica': 'quimica',
+    'Biologia': 'biologia',
+    # Inglês e Espanhol são agrupados como língua estrangeira
+    'Ingles': 'lingua_estrangeira',
+    'Espanhol': 'lingua_estrangeira',
+    # Formas já normalizadas (minúsculas, com '_'), para nomes fora do padrão
+    'lingua_portuguesa': 'portugues',
+    'ingles': 'lingua_estrangeira',
+    'espanhol': 'lingua_estrangeira'
+}
+
+
+@lru_cache(maxsize=8)
+def _carregar_json_cache(caminho: str, mtime: float) -> dict:
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo.decode('utf-8'))
+
+
+def carregar_json(caminho: Path) -> dict:
+    """
+    Carrega um arquivo JSON.
+    
+    O conteúdo fica em cache pelo caminho resolvido e pela data de modificação,
+    então o mesmo arquivo só é lido de novo se tiver sido alterado. O dicionário
+    retornado é compartilhado entre as chamadas e não deve ser modificado.
+    """
+    caminho = Path(caminho).resolve()
+    return _carregar_json_cache(str(caminho), caminho.stat().st_mtime)
+
+
+def _normalizar_materia(nome: str) -> str:
+    """Normaliza um nome de matéria que não está em MATERIA_CANON."""
+    materia = nome.lower().replace(' ', '_')
+    return MATERIA_CANON.get(materia, materia)
+
+
+def mapear_questoes_por_materia(info: dict) -> Dict[str, List[int]]:
+    """
+    Mapeia os números das questões para cada matéria baseado na estrutura do vestibular.
+    
+    Returns:
+        Dicionário com matéria como chave e lista de números de questões como valor
+    """
+    mapeamento = {
+        'portugues': [],
+        'literatura': [],
+        'matematica': [],
+        'geografia': [],
+        'historia': [],
+        'fisica': [],
+        'quimica': [],
+        'biologia': [],
+        'lingua_estrangeira': []
+    }
+    
+    # Dia 1 - PRIMEIRA_PROVA
+    estrutura_dia1 = info['provas_2024']['estrutura_prova']['dia_1']['distribuicao']
+    for item in estrutura_dia1:
+        materia = MATERIA_CANON.get(item['materia']) or _normalizar_materia(item['materia'])
+        
+        # Parse do range (ex: "1-15" -> 1, 2, ..., 15)
+        inicio, fim = item['questoes'].split('-', 1)
+        mapeamento[materia] += range(int(inicio), int(fim) + 1)
+    
+    # Dia 2 - SEGUNDA_PROVA
+    estrutura_dia2 = info['provas_2024']['estrutura_prova']['dia_2']['distribuicao']
+    for item in estrutura_dia2:
+        materia = MATERIA_CANON.get(item['materia']) or _normalizar_materia(item['materia'])
+        
+        inicio, fim = item['questoes'].split('-', 1)
+        mapeamento[materia] += range(int(inicio), int(fim) + 1)
+    
+    return mapeamento
+
+
+def indexar_materias_por_questao(mapeamento_questoes: Dict[str, List[int]]) -> List[Tuple[str, ...]]:
+    """
+    Monta a tabela inversa questão -> matérias a partir do mapeamento.
+    
+    Os números das questões se repetem entre matérias (o Dia 2 recomeça em 1 e
+    Língua Estrangeira cobre Inglês e Espanhol), por isso cada posição guarda
+    uma tupla com todas as matérias daquela questão.
+    
+    Returns:
+        Lista indexada pelo número da questão
+    """
+    maior_questao = max((max(qs) for qs in mapeamento_questoes.values() if qs), default=0)
+    tabela = [[] for _ in range(maior_questao + 1)]
+    for materia, questoes in mapeamento_questoes.items():
+        for q in questoes:
+            tabela[q].append(materia)
+    return [tuple(materias) for materias in tabela]
+
+
+def _questoes_acertadas(prova: dict) -> frozenset:
+    """Retorna as questões acertadas da prova como frozenset de int."""
+    iguais = prova.get('iguais', ())
+    if isinstance(iguais, frozenset):
+        return iguais
+    return frozenset(int(q) for q in iguais)
+
+
+def normalizar_resultados(results: dict) -> dict:
+    """
+    Converte uma vez as questões acertadas de cada LLM para frozenset de int.
+    
+    Devolve um novo dicionário (o carregado do JSON não é alterado), com o
+    qual contar_acertos_por_materia não precisa converter nada a cada chamada.
+    """
+    normalizados = {}
+    for llm_nome, llm_dados in results.items():
+        normalizados[llm_nome] = dict(llm_dados)
+        for prova in ('PRIMEIRA_PROVA', 'SEGUNDA_PROVA'):
+            if prova in llm_dados:
+                normalizados[llm_nome][prova] = {
+                    **llm_dados[prova],
+                    'iguais': _questoes_acertadas(llm_dados[prova])
+                }
+    return normalizados
+
+
+def contar_acertos_por_materia(
+    results_llm: dict,
+    mapeamento_questoes: Dict[str, List[int]],
+    materias_por_questao: Optional[List[Tuple[str, ...]]] = None
+) -> Dict[str, int]:
+    """
+    Conta quantas questões a LLM acertou em cada matéria.
+    
+    Percorre só as questões acertadas, usando a tabela de
+    indexar_materias_por_questao (montada aqui se não for passada).
+    """
+    if materias_por_questao is None:
+        materias_por_questao = indexar_materias_por_questao(mapeamento_questoes)
+    
+    acertos = {materia: 0 for materia in mapeamento_questoes}
+    
+    for q in _acertadas_no_indice(results_llm, len(materias_por_questao)):
+        for materia in materias_por_questao[q]:
+            acertos[materia] += 1
+    
+    return acertos
+
+
+def _acertadas_no_indice(results_llm: dict, n: int) -> List[int]:
+    """Questões acertadas pela LLM que estão na tabela questão -> matérias."""
+    primeira_prova = results_llm.get('PRIMEIRA_PROVA', {})
+    iguais_p1 = _questoes_acertadas(primeira_prova)
+    
+    segunda_prova = results_llm.get('SEGUNDA_PROVA', {})
+    iguais_p2 = _questoes_acertadas(segunda_prova)
+    
+    # Questões até 60 são do Dia 1, as demais do Dia 2
+    acertadas = [q for q in iguais_p1 if 0 <= q <= 60 and q < n]
+    acertadas += [q for q in iguais_p2 if 60 < q < n]
+    return acertadas
+
+
+def contar_acertos_llms(
+    results: dict,
+    mapeamento_questoes: Dict[str, List[int]],
+    materias_por_questao: Optional[List[Tuple[str, ...]]] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Conta os acertos por matéria de todas as LLMs de uma vez.
+    
+    Equivale a chamar contar_acertos_por_materia para cada LLM: as questões
+    acertadas de todas as LLMs viram pares (LLM, matéria), contados por um
+    único np.bincount.
+    
+    Returns:
+        Dicionário com o nome da LLM como chave e os acertos por matéria como valor
+    """
+    if materias_por_questao is None:
+        materias_por_questao = indexar_materias_por_questao(mapeamento_questoes)
+    
+    materias = list(mapeamento_questoes)
+    coluna = {materia: j for j, materia in enumerate(materias)}
+    n = len(materias_por_questao)
+    
+    # Pares (questão, matéria) da tabela, achatados em dois vetores
+    questao_idx = np.array([q for q in range(n) for _ in materias_por_questao[q]], dtype=np.intp)
+    materia_idx = np.array(
+        [coluna[materia] for materias_q in materias_por_questao for materia in materias_q],
+        dtype=np.intp
+    )
+    
+    acertou = np.zeros((len(results), n), dtype=bool)
+    for i, results_llm in enumerate(results.values()):
+        acertou[i, _acertadas_no_indice(results_llm, n)] = True
+    
+    llm_idx, par_idx = np.nonzero(acertou[:, questao_idx])
+    contagens = np.bincount(
+        llm_idx * len(materias) + materia_idx[par_idx],
+        minlength=len(results) * len(materias)
+    ).reshape(len(results), len(materias))
+    
+    return {
+        llm_nome: dict(zip(materias, linha))
+        for llm_nome, linha in zip(results, contagens.tolist())
+    }
@@ -6,15 +6,25 @@ Fórmula do Escore Padronizado: EP = ((EB - MD) / DP) * 100 + 500
 Fórmula do AC (média harmônica ponderada): AC = soma_pesos / soma(peso_i / EP_i)
 """
 
-import json
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from _common import (
+    carregar_json, mapear_questoes_por_materia, indexar_materias_por_questao,
+    normalizar_resultados, contar_acertos_por_materia
+)
 
-def carregar_json(caminho: Path) -> dict:
-    """Carrega um arquivo JSON."""
-    with open(caminho, 'r', encoding='utf-8') as f:
-        return json.load(f)
+
+@lru_cache(maxsize=64)
+def _coeficientes_ep(media: float, desvio_padrao: float) -> Tuple[float, float]:
+    """
+    Pré-calcula (a, b) tais que EP = a * EB + b para uma média e desvio padrão.
+    
+    As mesmas estatísticas se repetem para todas as LLMs e cursos.
+    """
+    return 100 / desvio_padrao, 500 - media * 100 / desvio_padrao
 
 
 def calcular_escore_padronizado(escore_bruto: float, media: float, desvio_padrao: float) -> float:
@@ -25,90 +35,17 @@ def calcular_escore_padronizado(escore_bruto: float, media: float, desvio_padrao
     """
     if desvio_padrao == 0:
         return 500.0
-    return ((escore_bruto - media) / desvio_padrao) * 100 + 500
+    a, b = _coeficientes_ep(media, desvio_padrao)
+    return a * escore_bruto + b
 
 
-def mapear_questoes_por_materia(info: dict) -> Dict[str, List[int]]:
-    """
-    Mapeia os números das questões para cada matéria baseado na estrutura do vestibular.
-    
-    Returns:
-        Dicionário com matéria como chave e lista de números de questões como valor
-    """
-    mapeamento = {
-        'portugues': [],
-        'literatura': [],
-        'matematica': [],
-        'geografia': [],
-        'historia': [],
-        'fisica': [],
-        'quimica': [],
-        'biologia': [],
-        'lingua_estrangeira': []
-    }
-    
-    # Dia 1 - PRIMEIRA_PROVA
-    estrutura_dia1 = info['provas_2024']['estrutura_prova']['dia_1']['distribuicao']
-    for item in estrutura_dia1:
-        questoes_range = item['questoes']
-        materia = item['materia'].lower().replace(' ', '_')
-        
-        # Parse do range (ex: "1-15" -> [1, 2, ..., 15])
-        inicio, fim = map(int, questoes_range.split('-'))
-        questoes = list(range(inicio, fim + 1))
-        
-        if materia == 'lingua_portuguesa':
-            mapeamento['portugues'].extend(questoes)
-        else:
-            mapeamento[materia].extend(questoes)
-    
-    # Dia 2 - SEGUNDA_PROVA
-    estrutura_dia2 = info['provas_2024']['estrutura_prova']['dia_2']['distribuicao']
-    for item in estrutura_dia2:
-        questoes_range = item['questoes']
-        materia = item['materia'].lower()
-        
-        inicio, fim = map(int, questoes_range.split('-'))
-        questoes = list(range(inicio, fim + 1))
-        
-        # Inglês e Espanhol são agrupados como língua estrangeira
-        if materia in ['ingles', 'espanhol']:
-            mapeamento['lingua_estrangeira'].extend(questoes)
-        else:
-            mapeamento[materia].extend(questoes)
-    
-    return mapeamento
+# A redação tem nota de 0 a 10, média ~6.0 e DP ~2.0 (valores típicos);
+# a nota considerada é a mesma para todas as LLMs
+NOTA_REDACAO = 9.98
+EP_REDACAO = calcular_escore_padronizado(NOTA_REDACAO, 6.0, 2.0)
 
-
-def contar_acertos_por_materia(
-    results_llm: dict,
-    mapeamento_questoes: Dict[str, List[int]]
-) -> Dict[str, int]:
-    """
-    Conta quantas questões a LLM acertou em cada matéria.
-    """
-    acertos = {materia: 0 for materia in mapeamento_questoes.keys()}
-    
-    # Processar PRIMEIRA_PROVA
-    primeira_prova = results_llm.get('PRIMEIRA_PROVA', {})
-    iguais_p1 = [int(q) for q in primeira_prova.get('iguais', [])]
-    
-    # Processar SEGUNDA_PROVA
-    segunda_prova = results_llm.get('SEGUNDA_PROVA', {})
-    iguais_p2 = [int(q) for q in segunda_prova.get('iguais', [])]
-    
-    # Contar acertos por matéria
-    for materia, questoes in mapeamento_questoes.items():
-        for q in questoes:
-            # Verificar se a questão está no dia 1 ou dia 2
-            if any(1 <= num <= 60 for num in questoes if num == q):  # Dia 1
-                if q in iguais_p1:
-                    acertos[materia] += 1
-            else:  # Dia 2
-                if q in iguais_p2:
-                    acertos[materia] += 1
-    
-    return acertos
+# Formato de uma linha da tabela de AC por curso, montado uma vez
+_linha_ac = "{:<35} {:10.2f}\n".format
 
 
 def calcular_total_questoes_por_materia(mapeamento_questoes: Dict[str, List[int]]) -> Dict[str, int]:
@@ -116,19 +53,41 @@ def calcular_total_questoes_por_materia(mapeamento_questoes: Dict[str, List[int]
     return {materia: len(questoes) for materia, questoes in mapeamento_questoes.items()}
 
 
-def calcular_ac_para_curso(
+def montar_stats_por_materia(estatisticas: dict, materias) -> Dict[str, Tuple[float, float]]:
+    """
+    Extrai uma vez a média e o desvio padrão de cada matéria.
+    
+    Língua Estrangeira usa as estatísticas de inglês como referência.
+    
+    Returns:
+        Dicionário matéria -> (média, desvio padrão)
+    """
+    stats_por_materia = {}
+    for materia in materias:
+        materia_stat = 'ingles' if materia == 'lingua_estrangeira' else materia
+        stats = estatisticas.get(materia_stat, {})
+        stats_por_materia[materia] = (stats.get('media', 0), stats.get('desvio_padrao', 1))
+    return stats_por_materia
+
+
+def calcular_escores_padronizados(
     acertos_por_materia: Dict[str, int],
     total_questoes_por_materia: Dict[str, int],
     estatisticas: dict,
-    pesos_curso: dict,
-    nota_redacao: float = 9.98
-) -> Tuple[float, Dict[str, float]]:
+    nota_redacao: float = NOTA_REDACAO,
+    stats_por_materia: Optional[Dict[str, Tuple[float, float]]] = None
+) -> Dict[str, float]:
     """
-    Calcula o Argumento de Classificação para um curso específico.
+    Calcula os escores padronizados de cada matéria (e de Português + Redação).
+    
+    Não depende do curso, então basta calcular uma vez por LLM.
     
     Returns:
-        Tupla com (AC, dicionário de escores padronizados por matéria)
+        Dicionário de escores padronizados por matéria
     """
+    if stats_por_materia is None:
+        stats_por_materia = montar_stats_por_materia(estatisticas, acertos_por_materia)
+    
     escores_padronizados = {}
     
     # Calcular escore padronizado para cada matéria
@@ -140,15 +99,7 @@ def calcular_ac_para_curso(
         # Escore bruto (número de acertos)
         escore_bruto = acertos
         
-        # Pegar estatísticas da matéria
-        # Ajustar nome da matéria para o formato do info.json
-        materia_stat = materia
-        if materia == 'lingua_estrangeira':
-            materia_stat = 'ingles'  # Usar inglês como referência
-        
-        stats = estatisticas.get(materia_stat, {})
-        media = stats.get('media', 0)
-        desvio = stats.get('desvio_padrao', 1)
+        media, desvio = stats_por_materia[materia]
         
         # Calcular escore padronizado
         ep = calcular_escore_padronizado(escore_bruto, media, desvio)
@@ -156,7 +107,10 @@ def calcular_ac_para_curso(
     
     # Adicionar redação ao Português (já convertida em escore padronizado)
     # A redação tem nota de 0 a 10, média ~6.0 e DP ~2.0 (valores típicos)
-    ep_redacao = calcular_escore_padronizado(nota_redacao, 6.0, 2.0)
+    if nota_redacao == NOTA_REDACAO:
+        ep_redacao = EP_REDACAO
+    else:
+        ep_redacao = calcular_escore_padronizado(nota_redacao, 6.0, 2.0)
     
     # Combinar Português com Redação (média dos dois escores)
     if 'portugues' in escores_padronizados:
@@ -166,6 +120,34 @@ def calcular_ac_para_curso(
     else:
         escores_padronizados['portugues_redacao'] = ep_redacao
     
+    return escores_padronizados
+
+
+def calcular_ac_para_curso(
+    acertos_por_materia: Dict[str, int],
+    total_questoes_por_materia: Dict[str, int],
+    estatisticas: dict,
+    pesos_curso: dict,
+    nota_redacao: float = NOTA_REDACAO,
+    escores_padronizados: Optional[Dict[str, float]] = None
+) -> Tuple[float, Dict[str, float]]:
+    """
+    Calcula o Argumento de Classificação para um curso específico.
+    
+    Se escores_padronizados (de calcular_escores_padronizados) for passado,
+    é usado diretamente em vez de ser recalculado para cada curso.
+    
+    Returns:
+        Tupla com (AC, dicionário de escores padronizados por matéria)
+    """
+    if escores_padronizados is None:
+        escores_padronizados = calcular_escores_padronizados(
+            acertos_por_materia,
+            total_questoes_por_materia,
+            estatisticas,
+            nota_redacao
+        )
+    
     # Calcular AC (média harmônica ponderada)
     soma_pesos = 0
     soma_inversos = 0
@@ -194,7 +176,7 @@ def main():
     
     # Carregar dados
     print("Carregando dados...")
-    results = carregar_json(results_path)
+    results = normalizar_resultados(carregar_json(results_path))
     info = carregar_json(info_path)
     pesos_data = carregar_json(pesos_path)
     
@@ -202,12 +184,15 @@ def main():
     
     # Mapear questões por matéria
     mapeamento_questoes = mapear_questoes_por_materia(info)
+    materias_por_questao = indexar_materias_por_questao(mapeamento_questoes)
+    materias_ordenadas = sorted(mapeamento_questoes)  # mesma ordem para todas as LLMs
     total_questoes = calcular_total_questoes_por_materia(mapeamento_questoes)
+    stats_por_materia = montar_stats_por_materia(estatisticas, mapeamento_questoes)
     
     print("\n" + "=" * 100)
     print("CÁLCULO DO ARGUMENTO DE CLASSIFICAÇÃO (AC) - VESTIBULAR UFRGS 2024")
     print("=" * 100)
-    print(f"\nNota da Redação considerada: 9.98")
+    print(f"\nNota da Redação considerada: {NOTA_REDACAO}")
     print("=" * 100)
     
     # Processar cada LLM
@@ -217,11 +202,12 @@ def main():
         print(f"{'=' * 100}")
         
         # Contar acertos por matéria
-        acertos = contar_acertos_por_materia(llm_dados, mapeamento_questoes)
+        acertos = contar_acertos_por_materia(llm_dados, mapeamento_questoes, materias_por_questao)
         
         print("\nDesempenho por Matéria:")
         print("-" * 100)
-        for materia, acertos_num in sorted(acertos.items()):
+        for materia in materias_ordenadas:
+            acertos_num = acertos[materia]
             total = total_questoes[materia]
             percentual = (acertos_num / total * 100) if total > 0 else 0
             print(f"  {materia.replace('_', ' ').title():<25}: {acertos_num:2d}/{total:2d} = {percentual:6.2f}%")
@@ -233,21 +219,26 @@ def main():
         print(f"{'Curso':<35} {'AC':>10}")
         print("-" * 100)
         
+        # Os escores padronizados são os mesmos para todos os cursos
+        escores = calcular_escores_padronizados(
+            acertos, total_questoes, estatisticas, stats_por_materia=stats_por_materia
+        )
+        
         resultados_cursos = []
         for curso, pesos in pesos_data['pesos_provas_por_curso'].items():
             ac, _ = calcular_ac_para_curso(
                 acertos,
                 total_questoes,
                 estatisticas,
-                pesos
+                pesos,
+                escores_padronizados=escores
             )
             resultados_cursos.append((curso, ac))
         
         # Ordenar por AC (decrescente)
         resultados_cursos.sort(key=lambda x: x[1], reverse=True)
         
-        for curso, ac in resultados_cursos:
-            print(f"{curso:<35} {ac:10.2f}")
+        sys.stdout.write("".join(_linha_ac(curso, ac) for curso, ac in resultados_cursos))
         
         print("-" * 100)
         print(f"{'Melhor curso':<35} {resultados_cursos[0][0]}: {resultados_cursos[0][1]:.2f}")
@@ -54,6 +54,21 @@ def calcular_total_questoes(dados_prova):
     return acertos + erros
 
 
+def _acertos_total(dados_prova):
+    """
+    Calcula acertos e total de questões de uma prova numa só passada.
+    
+    Args:
+        dados_prova: Dicionário com os dados da prova (iguais e diferentes)
+        
+    Returns:
+        tuple: (acertos, total de questões)
+    """
+    acertos = len(dados_prova.get("iguais", ()))
+    erros = len(dados_prova.get("diferentes", ()))
+    return acertos, acertos + erros
+
+
 def main():
     """Função principal do programa."""
     # Caminho para o arquivo results.json
@@ -84,12 +99,10 @@ def main():
         segunda_prova = llm_dados.get("SEGUNDA_PROVA", {})
         
         # Calcular acertos e totais
-        acertos_p1 = calcular_acertos(primeira_prova)
-        total_p1 = calcular_total_questoes(primeira_prova)
+        acertos_p1, total_p1 = _acertos_total(primeira_prova)
         nota_p1 = (acertos_p1 / total_p1 * 100) if total_p1 > 0 else 0
         
-        acertos_p2 = calcular_acertos(segunda_prova)
-        total_p2 = calcular_total_questoes(segunda_prova)
+        acertos_p2, total_p2 = _acertos_total(segunda_prova)
         nota_p2 = (acertos_p2 / total_p2 * 100) if total_p2 > 0 else 0
         
         # Calcular média harmônica
@@ -6,111 +6,94 @@ Usa os Escores Padronizados (EP) reais do vestibular UFRGS.
 Fórmula da média harmônica ponderada: MH = soma_pesos / soma(peso_i / EP_i)
 """
 
-import json
+import heapq
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 
-def carregar_json(caminho: Path) -> dict:
-    """Carrega um arquivo JSON."""
-    with open(caminho, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from _common import (
+    carregar_json, mapear_questoes_por_materia, indexar_materias_por_questao,
+    normalizar_resultados, contar_acertos_por_materia
+)
 
 
-def mapear_questoes_por_materia(info: dict) -> Dict[str, List[int]]:
-    """
-    Mapeia os números das questões para cada matéria.
-    """
-    mapeamento = {
-        'portugues': [],
-        'literatura': [],
-        'matematica': [],
-        'geografia': [],
-        'historia': [],
-        'fisica': [],
-        'quimica': [],
-        'biologia': [],
-        'lingua_estrangeira': []
-    }
-    
-    # Dia 1
-    estrutura_dia1 = info['provas_2024']['estrutura_prova']['dia_1']['distribuicao']
-    for item in estrutura_dia1:
-        questoes_range = item['questoes']
-        materia = item['materia'].lower().replace(' ', '_')
-        
-        inicio, fim = map(int, questoes_range.split('-'))
-        questoes = list(range(inicio, fim + 1))
-        
-        if materia == 'lingua_portuguesa':
-            mapeamento['portugues'].extend(questoes)
-        else:
-            mapeamento[materia].extend(questoes)
-    
-    # Dia 2
-    estrutura_dia2 = info['provas_2024']['estrutura_prova']['dia_2']['distribuicao']
-    for item in estrutura_dia2:
-        questoes_range = item['questoes']
-        materia = item['materia'].lower()
-        
-        inicio, fim = map(int, questoes_range.split('-'))
-        questoes = list(range(inicio, fim + 1))
-        
-        if materia in ['ingles', 'espanhol']:
-            mapeamento['lingua_estrangeira'].extend(questoes)
-        else:
-            mapeamento[materia].extend(questoes)
-    
-    return mapeamento
+# Abreviações usadas em pesos.json -> nomes das matérias
+MAPEAMENTO_ABREV = {
+    'POR': 'portugues_redacao',
+    'LIT': 'literatura',
+    'GEO': 'geografia',
+    'HIS': 'historia',
+    'BIO': 'biologia',
+    'FIS': 'fisica',
+    'QUI': 'quimica',
+    'MAT': 'matematica',
+    'LIN': 'lingua_estrangeira'
+}
 
+# Colunas da matriz de pesos (uma por matéria com peso)
+MATERIAS_COLUNAS = list(MAPEAMENTO_ABREV.values())
 
-def contar_acertos_por_materia(
-    results_llm: dict,
-    mapeamento_questoes: Dict[str, List[int]]
-) -> Dict[str, int]:
-    """
-    Conta quantas questões a LLM acertou em cada matéria.
+# Formatos das linhas das tabelas de cursos, montados uma vez
+_linha_curso = "  {:<40} {:6.2f}\n".format
+_linha_top = "  {:2d}. {:<45} {:6.2f}\n".format
+_coluna_curso = "{:<45} ".format
+_celula_mh = "{:10.2f}  ".format
+
+
+def _entrada_ep(materia_stats: dict) -> Tuple[Dict[int, float], float, float]:
+    """Extrai (acertos -> EP, média, desvio padrão) das estatísticas de uma matéria."""
+    escores = {}
+    for item in materia_stats.get('escores', []):
+        escores.setdefault(item['acertos'], item['ep'])
+    return escores, materia_stats.get('media', 0), materia_stats.get('desvio_padrao', 1)
+
+
+def montar_tabela_ep(estatisticas: dict) -> Dict[str, Tuple[Dict[int, float], float, float]]:
     """
-    acertos = {materia: 0 for materia in mapeamento_questoes.keys()}
-    
-    primeira_prova = results_llm.get('PRIMEIRA_PROVA', {})
-    iguais_p1 = [int(q) for q in primeira_prova.get('iguais', [])]
+    Pré-processa as estatísticas para consultas de EP em tempo constante.
     
-    segunda_prova = results_llm.get('SEGUNDA_PROVA', {})
-    iguais_p2 = [int(q) for q in segunda_prova.get('iguais', [])]
+    A chave 'lingua_estrangeira' já aponta para as estatísticas de inglês,
+    usadas como referência, para que a consulta seja direta pelo nome da matéria.
     
-    for materia, questoes in mapeamento_questoes.items():
-        for q in questoes:
-            if q <= 60:  # Dia 1
-                if q in iguais_p1:
-                    acertos[materia] += 1
-            else:  # Dia 2
-                if q in iguais_p2:
-                    acertos[materia] += 1
-    
-    return acertos
+    Returns:
+        Dicionário matéria -> (acertos -> EP, média, desvio padrão)
+    """
+    tabela = {materia: _entrada_ep(stats) for materia, stats in estatisticas.items()}
+    tabela['lingua_estrangeira'] = tabela.get('ingles', ({}, 0, 1))
+    return tabela
 
 
-def obter_ep_por_acertos(estatisticas: dict, materia: str, acertos: int) -> float:
+def obter_ep_por_acertos(
+    estatisticas: dict,
+    materia: str,
+    acertos: int,
+    tabela_ep: Optional[dict] = None
+) -> float:
     """
     Obtém o Escore Padronizado (EP) baseado no número de acertos.
-    """
-    # Ajustar nome da matéria para buscar nas estatísticas
-    materia_lookup = materia
-    if materia == 'lingua_estrangeira':
-        materia_lookup = 'ingles'  # Usar inglês como referência
     
-    materia_stats = estatisticas.get(materia_lookup, {})
-    escores = materia_stats.get('escores', [])
+    Se tabela_ep (ver montar_tabela_ep) for passada, as estatísticas
+    não são percorridas de novo.
+    """
+    if tabela_ep is None:
+        # Ajustar nome da matéria para buscar nas estatísticas
+        materia_lookup = materia
+        if materia == 'lingua_estrangeira':
+            materia_lookup = 'ingles'  # Usar inglês como referência
+        escores, media, desvio = _entrada_ep(estatisticas.get(materia_lookup, {}))
+    else:
+        escores, media, desvio = tabela_ep.get(materia, ({}, 0, 1))
     
     # Buscar o EP correspondente ao número de acertos
-    for item in escores:
-        if item['acertos'] == acertos:
-            return item['ep']
+    ep = escores.get(acertos)
+    if ep is not None:
+        return ep
     
     # Se não encontrar, calcular usando a fórmula
-    media = materia_stats.get('media', 0)
-    desvio = materia_stats.get('desvio_padrao', 1)
     if desvio > 0:
         return ((acertos - media) / desvio) * 100 + 500
     return 500.0
@@ -126,10 +109,16 @@ def calcular_ep_redacao(nota_redacao: float) -> float:
     return ((nota_redacao - media_redacao) / dp_redacao) * 100 + 500
 
 
+# Nota da redação considerada para todas as LLMs e o seu EP, calculado uma vez
+NOTA_REDACAO = 9.98
+EP_REDACAO = calcular_ep_redacao(NOTA_REDACAO)
+
+
 def calcular_eps_por_materia(
     acertos: Dict[str, int],
     estatisticas: dict,
-    nota_redacao: float = 9.98
+    nota_redacao: float = NOTA_REDACAO,
+    tabela_ep: Optional[dict] = None
 ) -> Dict[str, float]:
     """
     Calcula os Escores Padronizados (EP) para cada matéria.
@@ -137,10 +126,13 @@ def calcular_eps_por_materia(
     eps = {}
     
     for materia, acertos_num in acertos.items():
-        eps[materia] = obter_ep_por_acertos(estatisticas, materia, acertos_num)
+        eps[materia] = obter_ep_por_acertos(estatisticas, materia, acertos_num, tabela_ep)
     
     # Calcular EP da redação
-    ep_redacao = calcular_ep_redacao(nota_redacao)
+    if nota_redacao == NOTA_REDACAO:
+        ep_redacao = EP_REDACAO
+    else:
+        ep_redacao = calcular_ep_redacao(nota_redacao)
     
     # Combinar Português com Redação (média aritmética dos EPs)
     if 'portugues' in eps:
@@ -151,39 +143,41 @@ def calcular_eps_por_materia(
     return eps
 
 
+def compilar_pesos(pesos: dict) -> List[Tuple[str, float]]:
+    """
+    Converte os pesos de um curso (abreviação -> peso) em pares (matéria, peso).
+    
+    Descarta 'total' e abreviações desconhecidas, para que o cálculo da
+    média harmônica possa percorrer a lista diretamente.
+    """
+    return [
+        (MAPEAMENTO_ABREV[abrev], peso)
+        for abrev, peso in pesos.items()
+        if abrev in MAPEAMENTO_ABREV
+    ]
+
+
 def calcular_media_harmonica_ponderada(
     eps: Dict[str, float],
-    pesos: dict
+    pesos
 ) -> float:
     """
     Calcula a média harmônica ponderada usando os EPs.
     
     MH = soma_pesos / soma(peso_i / EP_i)
+    
+    Args:
+        eps: EPs por matéria
+        pesos: Pesos do curso, já compilados com compilar_pesos
+            (um dicionário de abreviações também é aceito)
     """
-    # Mapeamento de abreviações para nomes completos
-    mapeamento_abrev = {
-        'POR': 'portugues_redacao',
-        'LIT': 'literatura',
-        'GEO': 'geografia',
-        'HIS': 'historia',
-        'BIO': 'biologia',
-        'FIS': 'fisica',
-        'QUI': 'quimica',
-        'MAT': 'matematica',
-        'LIN': 'lingua_estrangeira'
-    }
+    if isinstance(pesos, dict):
+        pesos = compilar_pesos(pesos)
     
     soma_pesos = 0
     soma_inversos = 0
     
-    for abrev, peso in pesos.items():
-        if abrev == 'total':
-            continue
-        
-        materia = mapeamento_abrev.get(abrev)
-        if materia is None:
-            continue
-            
+    for materia, peso in pesos:
         ep = eps.get(materia, 500)  # 500 é o EP médio
         if ep > 0:
             soma_pesos += peso
@@ -196,6 +190,132 @@ def calcular_media_harmonica_ponderada(
     return 0.0
 
 
+def montar_matriz_pesos(pesos_compilados: Dict[str, List[Tuple[str, float]]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Empilha os pesos compilados de todos os cursos numa matriz.
+    
+    Returns:
+        Tupla com (cursos, W, usadas): W tem uma linha por curso e uma coluna
+        por matéria de MATERIAS_COLUNAS (0 onde o curso não usa a matéria);
+        usadas marca as matérias presentes nos pesos de cada curso
+    """
+    coluna = {materia: j for j, materia in enumerate(MATERIAS_COLUNAS)}
+    cursos = list(pesos_compilados)
+    W = np.zeros((len(cursos), len(MATERIAS_COLUNAS)))
+    usadas = np.zeros(W.shape, dtype=bool)
+    
+    for i, curso in enumerate(cursos):
+        for materia, peso in pesos_compilados[curso]:
+            W[i, coluna[materia]] = peso
+            usadas[i, coluna[materia]] = True
+    
+    return cursos, W, usadas
+
+
+def calcular_media_harmonica_cursos(
+    eps: Dict[str, float],
+    W: np.ndarray,
+    usadas: np.ndarray
+) -> np.ndarray:
+    """
+    Calcula a média harmônica ponderada de todos os cursos de uma vez.
+    
+    Equivale a chamar calcular_media_harmonica_ponderada para cada linha
+    de W (ver montar_matriz_pesos).
+    
+    Returns:
+        Vetor com a MH de cada curso, na ordem das linhas de W
+    """
+    E = np.array([eps.get(materia, 500) for materia in MATERIAS_COLUNAS], dtype=float)
+    
+    return _mh_matriz(E[None, :], W, usadas)[0]
+
+
+def _mh_matriz(E: np.ndarray, W: np.ndarray, usadas: np.ndarray) -> np.ndarray:
+    """MH de cada linha de E (EPs de uma LLM) para cada curso de W."""
+    positivo = E > 0
+    
+    soma_pesos = W.sum(axis=1)
+    # soma(peso_i / EP_i) de todas as LLMs e cursos num só produto de matrizes
+    soma_inversos = np.where(positivo, 1.0 / np.where(positivo, E, 1.0), 0.0) @ W.T
+    
+    mh = np.zeros(soma_inversos.shape)
+    np.divide(soma_pesos[None, :], soma_inversos, out=mh, where=soma_inversos > 0)
+    
+    # Um EP não positivo numa matéria com peso zera a média do curso
+    mh[(usadas[None, :, :] & ~positivo[:, None, :]).any(axis=2)] = 0.0
+    return mh
+
+
+def calcular_media_harmonica_llms(
+    eps_llms: List[Dict[str, float]],
+    W: np.ndarray,
+    usadas: np.ndarray
+) -> np.ndarray:
+    """
+    Calcula a média harmônica ponderada de todos os cursos para várias LLMs.
+    
+    Returns:
+        Matriz (LLMs × cursos): a linha k equivale a
+        calcular_media_harmonica_cursos(eps_llms[k], W, usadas)
+    """
+    E = np.array(
+        [[eps.get(materia, 500) for materia in MATERIAS_COLUNAS] for eps in eps_llms],
+        dtype=float
+    ).reshape(len(eps_llms), len(MATERIAS_COLUNAS))
+    return _mh_matriz(E, W, usadas)
+
+
+def processar_llm(
+    llm_dados: dict,
+    mapeamento_questoes: Dict[str, List[int]],
+    materias_por_questao: List[Tuple[str, ...]],
+    estatisticas: dict,
+    tabela_ep: dict,
+    cursos: List[str],
+    W: np.ndarray,
+    usadas: np.ndarray
+) -> Tuple[Dict[str, int], Dict[str, float], List[Tuple[str, float]]]:
+    """
+    Calcula acertos, EPs e a MH de todos os cursos para uma LLM.
+    
+    Não depende de estado compartilhado, então pode rodar em outro processo.
+    
+    Returns:
+        Tupla com (acertos por matéria, EPs por matéria, lista (curso, MH)
+        na ordem de cursos)
+    """
+    acertos = contar_acertos_por_materia(llm_dados, mapeamento_questoes, materias_por_questao)
+    eps = calcular_eps_por_materia(acertos, estatisticas, NOTA_REDACAO, tabela_ep)
+    mhs = calcular_media_harmonica_cursos(eps, W, usadas)
+    return acertos, eps, list(zip(cursos, mhs.tolist()))
+
+
+def processar_llms(results: dict, *args, max_workers: Optional[int] = None) -> dict:
+    """
+    Roda processar_llm para cada LLM.
+    
+    Por padrão roda tudo no processo atual: com poucas LLMs o custo de
+    subir processos e serializar os argumentos supera o próprio cálculo.
+    
+    Args:
+        results: Resultados por LLM
+        *args: Demais argumentos de processar_llm
+        max_workers: Se informado (e maior que 1), número de processos de
+            um ProcessPoolExecutor usado para paralelizar por LLM
+    
+    Returns:
+        Dicionário LLM -> retorno de processar_llm, na ordem de results
+    """
+    if max_workers is None or max_workers <= 1 or len(results) <= 1:
+        saidas = [processar_llm(llm_dados, *args) for llm_dados in results.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            saidas = list(executor.map(processar_llm, results.values(), *map(repeat, args)))
+    
+    return dict(zip(results, saidas))
+
+
 def main():
     """Função principal."""
     # Caminhos dos arquivos
@@ -205,18 +325,23 @@ def main():
     pesos_path = base_path / "pesos.json"
     
     # Carregar dados
-    results = carregar_json(results_path)
+    results = normalizar_resultados(carregar_json(results_path))
     info = carregar_json(info_path)
     pesos_data = carregar_json(pesos_path)
     
     estatisticas = info['provas_2024']['estatisticas']
+    tabela_ep = montar_tabela_ep(estatisticas)
     pesos_cursos = pesos_data.get('pesos_provas', pesos_data.get('pesos_provas_por_curso', {}))
+    pesos_compilados = {curso: compilar_pesos(pesos) for curso, pesos in pesos_cursos.items()}
+    cursos_matriz, W, usadas = montar_matriz_pesos(pesos_compilados)
     
     # Mapear questões
     mapeamento_questoes = mapear_questoes_por_materia(info)
+    materias_por_questao = indexar_materias_por_questao(mapeamento_questoes)
+    materias_ordenadas = sorted(mapeamento_questoes)  # mesma ordem para todas as LLMs
     
-    nota_redacao = 9.98
-    ep_redacao = calcular_ep_redacao(nota_redacao)
+    nota_redacao = NOTA_REDACAO
+    ep_redacao = EP_REDACAO
     
     print("=" * 120)
     print("MÉDIA HARMÔNICA PONDERADA POR CURSO - VESTIBULAR UFRGS")
@@ -225,41 +350,38 @@ def main():
     print("Usando Escores Padronizados (EP) reais do vestibular UFRGS")
     print("=" * 120)
     
-    # Processar cada LLM
-    for llm_nome, llm_dados in results.items():
+    # Calcular tudo por LLM e depois exibir na ordem original
+    processados = processar_llms(
+        results, mapeamento_questoes, materias_por_questao, estatisticas,
+        tabela_ep, cursos_matriz, W, usadas
+    )
+    
+    # Os resultados ficam guardados para o resumo comparativo
+    llm_resultados = {}
+    for llm_nome, (acertos, eps, resultados_cursos) in processados.items():
         print(f"\n{llm_nome}")
         print("-" * 120)
         
-        # Contar acertos
-        acertos = contar_acertos_por_materia(llm_dados, mapeamento_questoes)
-        
-        # Calcular EPs
-        eps = calcular_eps_por_materia(acertos, estatisticas, nota_redacao)
-        
         # Mostrar desempenho por matéria com EP
         print("\nDesempenho por Matéria (Acertos -> EP):")
-        for materia in sorted(acertos.keys()):
+        for materia in materias_ordenadas:
             acertos_num = acertos[materia]
             ep = eps[materia]
             print(f"  {materia.replace('_', ' ').title():<25}: {acertos_num:2d} acertos -> EP: {ep:6.2f}")
         print(f"  {'Portugues + Redacao':<25}: EP combinado: {eps['portugues_redacao']:6.2f}")
         
-        # Calcular média harmônica para cada curso
+        # Média harmônica para cada curso
         print(f"\n{'─' * 120}")
         print(f"Média Harmônica Ponderada por Curso (Total de {len(pesos_cursos)} cursos):")
         print(f"{'─' * 120}")
         
-        resultados_cursos = []
-        for curso, pesos in pesos_cursos.items():
-            mh = calcular_media_harmonica_ponderada(eps, pesos)
-            resultados_cursos.append((curso, mh))
+        llm_resultados[llm_nome] = dict(resultados_cursos)
         
         # Ordenar por média harmônica (decrescente)
         resultados_cursos.sort(key=lambda x: x[1], reverse=True)
         
         # Exibir resultados
-        for curso, mh in resultados_cursos:
-            print(f"  {curso:<40} {mh:6.2f}")
+        sys.stdout.write("".join(_linha_curso(curso, mh) for curso, mh in resultados_cursos))
         
         print("-" * 120)
         print(f"  {'MELHOR:':<40} {resultados_cursos[0][0]}: {resultados_cursos[0][1]:.2f}")
@@ -272,47 +394,36 @@ def main():
     # Criar tabela comparativa
     cursos = list(pesos_cursos.keys())
     
-    # Calcular para todas LLMs
-    llm_resultados = {}
-    for llm_nome, llm_dados in results.items():
-        acertos = contar_acertos_por_materia(llm_dados, mapeamento_questoes)
-        eps = calcular_eps_por_materia(acertos, estatisticas, nota_redacao)
-        
-        llm_resultados[llm_nome] = {}
-        for curso, pesos in pesos_cursos.items():
-            mh = calcular_media_harmonica_ponderada(eps, pesos)
-            llm_resultados[llm_nome][curso] = mh
-    
     # Exibir top 20 de cada LLM
     for llm_nome in results.keys():
         print(f"\nTOP 20 CURSOS - {llm_nome}:")
         print("-" * 120)
         
-        # Ordenar cursos por MH para esta LLM
-        cursos_ordenados = sorted(
+        # Os 20 cursos com maior MH para esta LLM (sem ordenar a lista toda)
+        cursos_ordenados = heapq.nlargest(
+            20,
             [(curso, llm_resultados[llm_nome][curso]) for curso in cursos],
-            key=lambda x: x[1],
-            reverse=True
-        )[:20]
+            key=lambda x: x[1]
+        )
         
-        for i, (curso, mh) in enumerate(cursos_ordenados, 1):
-            print(f"  {i:2d}. {curso:<45} {mh:6.2f}")
+        sys.stdout.write("".join(
+            _linha_top(i, curso, mh) for i, (curso, mh) in enumerate(cursos_ordenados, 1)
+        ))
     
     print("\n" + "=" * 120)
     print(f"\nTABELA COMPLETA DE TODOS OS {len(cursos)} CURSOS")
     print("=" * 120)
-    print(f"\n{'Curso':<45} ", end="")
-    for llm in results.keys():
-        print(f"{llm:>10}", end="  ")
-    print()
-    print("-" * 120)
     
+    # Montar a tabela inteira e escrever de uma vez
+    linhas = [f"\n{'Curso':<45} " + "".join(f"{llm:>10}  " for llm in results) + "\n"]
+    linhas.append("-" * 120 + "\n")
     for curso in sorted(cursos):
-        print(f"{curso:<45} ", end="")
-        for llm in results.keys():
-            mh = llm_resultados[llm][curso]
-            print(f"{mh:10.2f}", end="  ")
-        print()
+        linhas.append(
+            _coluna_curso(curso)
+            + "".join(_celula_mh(llm_resultados[llm][curso]) for llm in results)
+            + "\n"
+        )
+    sys.stdout.write("".join(linhas))
     
     print("=" * 120)
 
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'LLMApiaAproach'))
+
+from cache import ResponseCache, SemanticCache, alternatives_key, embed_text
+
+QUESTION = ("Assinale a alternativa que preenche corretamente as lacunas do texto. "
+            "(A) mas - porque (B) porém - pois (C) e - que (D) ou - se (E) nem - como")
+REORDERED = ("Assinale a alternativa que preenche corretamente as lacunas do texto. "
+             "(A) e - que (B) porém - pois (C) mas - porque (D) ou - se (E) nem - como")
+
+
+class FakeEmbedder:
+    """Dense embedder stand-in: trigram vectors as a dense list."""
+
+    name = "fake"
+    default_threshold = 0.9
+
+    def __call__(self, text):
+        vector = [0.0] * 1024
+        for bucket, weight in embed_text(text).items():
+            vector[bucket] = weight
+        return vector
+
+
+class TestSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'answers.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _cache(self, **kwargs):
+        cache = SemanticCache("test:model", path=self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_exact_match_is_the_default(self):
+        cache = self._cache()
+        cache.set(QUESTION, "B")
+
+        self.assertEqual(cache.get(QUESTION), "B")
+        self.assertIsNone(cache.get(QUESTION.replace("preenche", "NÃO preenche")))
+        self.assertIsNone(cache.get(QUESTION + " "))
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 2})
+
+    def test_near_duplicates_only_with_flag(self):
+        self._cache().set(QUESTION, "B")
+        near_duplicate = QUESTION.replace("texto.", "texto .")
+
+        self.assertIsNone(self._cache().get(near_duplicate))
+        self.assertEqual(self._cache(near_duplicates=True).get(near_duplicate), "B")
+
+    def test_near_duplicates_need_the_same_alternatives_in_order(self):
+        self._cache().set(QUESTION, "A")
+
+        self.assertNotEqual(alternatives_key(QUESTION), alternatives_key(REORDERED))
+        self.assertIsNone(self._cache(near_duplicates=True).get(REORDERED))
+        # Without alternatives there is nothing to check, so no near-duplicate hit
+        self.assertIsNone(alternatives_key("Questão sem alternativas"))
+
+    def test_dense_embedder(self):
+        cache = self._cache(embedder=FakeEmbedder(), near_duplicates=True)
+        cache.set(QUESTION, "B")
+
+        self.assertEqual(cache.get(QUESTION.replace("texto.", "texto .")), "B")
+        self.assertIsNone(cache.get(REORDERED))
+        # Dense entries are not visible to the trigram cache
+        self.assertIsNone(self._cache().get(QUESTION))
+
+    def test_cache_without_alternatives_column(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE answers (key TEXT PRIMARY KEY, namespace TEXT NOT NULL, "
+            "embedding TEXT NOT NULL, answer TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+        conn.close()
+
+        cache = self._cache(near_duplicates=True)
+        cache.set(QUESTION, "B")
+        self.assertEqual(cache.get(QUESTION), "B")
+
+    def test_entries_persist_per_namespace(self):
+        self._cache().set(QUESTION, "B")
+
+        self.assertEqual(self._cache().get(QUESTION), "B")
+        other = SemanticCache("other:model", path=self.path)
+        self.addCleanup(other.close)
+        self.assertIsNone(other.get(QUESTION))
+
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'responses.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _cache(self, **kwargs):
+        cache = ResponseCache(path=self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_key_covers_the_whole_request(self):
+        key = ResponseCache.make_key("openai", "gpt-4o-mini", "system", "user", 0.3)
+
+        self.assertEqual(key, ResponseCache.make_key("openai", "gpt-4o-mini", "system", "user", 0.3))
+        for other in [("groq", "gpt-4o-mini", "system", "user", 0.3),
+                      ("openai", "gpt-4o", "system", "user", 0.3),
+                      ("openai", "gpt-4o-mini", "other", "user", 0.3),
+                      ("openai", "gpt-4o-mini", "system", "user ", 0.3),
+                      ("openai", "gpt-4o-mini", "system", "user", 0.0)]:
+            self.assertNotEqual(key, ResponseCache.make_key(*other), other)
+
+    def test_responses_persist(self):
+        key = ResponseCache.make_key("openai", "gpt-4o-mini", "system", "user", 0.3)
+        self.assertIsNone(self._cache().get(key))
+
+        self._cache().set(key, "B")
+        self.assertEqual(self._cache().get(key), "B")
+
+    def test_ttl(self):
+        cache = self._cache(ttl=60)
+        cache.set("key", "B")
+        self.assertEqual(cache.get("key"), "B")
+
+        with mock.patch("cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(self._cache().get("key"), "B")
+
+
+if __name__ == '__main__':
+    unittest.main()
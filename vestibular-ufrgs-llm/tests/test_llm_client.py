@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'LLMApiaAproach'))
+
+from cache import ResponseCache
+from llm_client import LLMClient
+
+
+class FakeError(Exception):
+
+    def __init__(self, status_code=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class TestLLMClient(unittest.TestCase):
+
+    def setUp(self):
+        # Ollama needs no API key; requests never leave the client
+        self.client = LLMClient(provider="ollama", max_retries=2)
+        self.addCleanup(self.client.close)
+        self.prompts = []
+        self.client._complete = self._complete
+
+    def _complete(self, system_prompt, user_prompt, max_tokens=None):
+        self.prompts.append(user_prompt)
+        return "C"
+
+    def test_consensus_skips_agreed_questions(self):
+        questions = {1: "Questão um", 2: "Questão dois", 3: "Questão três", 4: "Questão quatro"}
+        prior_answers = {
+            1: ["A", "a ", "A"],
+            2: ["A", "B"],
+            3: ["A"],
+            4: ["B", "Error getting answer: timeout", "B"],
+        }
+
+        answers = self.client.answer_multiple_questions(questions, prior_answers=prior_answers)
+
+        self.assertEqual(answers[1], {"question": "Questão um", "answer": "A", "source": "consensus"})
+        self.assertEqual(answers[4]["source"], "consensus")
+        self.assertEqual(answers[4]["answer"], "B")
+        # Split votes and a single vote are not enough
+        self.assertEqual(answers[2], {"question": "Questão dois", "answer": "C"})
+        self.assertEqual(answers[3]["answer"], "C")
+        self.assertEqual(sorted(self.prompts), ["Questão dois", "Questão três"])
+
+    def test_consensus_threshold(self):
+        prior_answers = {1: ["A", "A", "B"]}
+
+        answers = self.client.answer_multiple_questions(
+            {1: "Questão"}, prior_answers=prior_answers, consensus_threshold=0.6
+        )
+        self.assertEqual(answers[1]["source"], "consensus")
+
+        answers = self.client.answer_multiple_questions(
+            {1: "Questão"}, prior_answers=prior_answers, consensus_threshold=0.8
+        )
+        self.assertNotIn("source", answers[1])
+
+    def test_duplicate_questions_are_sent_once(self):
+        questions = {
+            1: {"text": "Mesma questão", "number": 1},
+            2: {"text": "Outra questão", "number": 2},
+            3: {"text": "Mesma questão", "number": 3},
+        }
+
+        answers = self.client.answer_multiple_questions(questions)
+
+        self.assertEqual(sorted(self.prompts), ["Mesma questão", "Outra questão"])
+        self.assertEqual(list(answers), [1, 2, 3])
+        self.assertEqual(answers[3], {"question": questions[3], "answer": "C"})
+
+    def test_response_cache(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.client.cache = ResponseCache(path=os.path.join(tmpdir.name, 'responses.sqlite'))
+        self.addCleanup(self.client.cache.close)
+
+        self.assertEqual(self.client.answer_question("Questão"), "C")
+        self.assertEqual(self.client.answer_question("Questão"), "C")
+
+        self.assertEqual(self.prompts, ["Questão"])
+        self.assertEqual(self.client.stats, {"hits": 1, "misses": 1})
+
+    def test_only_transient_errors_are_retried(self):
+        for status, retryable in [(429, True), (408, True), (503, True), (400, False), (401, False)]:
+            self.assertEqual(LLMClient._is_retryable(FakeError(status)), retryable, status)
+        self.assertTrue(LLMClient._is_retryable(TimeoutError()))
+        self.assertFalse(LLMClient._is_retryable(ValueError()))
+
+        calls = []
+
+        def fail(error):
+            calls.append(error)
+            raise error
+
+        with mock.patch("llm_client.time.sleep") as sleep:
+            with self.assertRaises(FakeError):
+                self.client._with_retry(fail, FakeError(400))
+            self.assertEqual(len(calls), 1)
+
+            with self.assertRaises(FakeError):
+                self.client._with_retry(fail, FakeError(429))
+            self.assertEqual(len(calls), 4)
+            self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import itertools
+import os
+import re
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'parser'))
+
+import pdf_parser
+from pdf_parser import iter_question_matches, prefetch
+
+OLD_QUESTION_RE = re.compile(r'(\d{2,3})\.\s+(.*?)(?=\d{2,3}\.|$)', re.DOTALL)
+
+TEXTS = [
+    "",
+    "Sem questões aqui.",
+    "01. Primeira questão (A) um (B) dois\n02. Segunda questão (A) três",
+    "Cabeçalho 26. Leia o texto.\n\nEm 1984. o autor (A) 12 (B) 13\n27.Sem espaço 28.  Com espaços\n",
+    "101. Questão de três dígitos 1234. número longo 99.\tfim",
+    "05. Números em outra escrita: ٠١. e ۱۲. (A) x",
+    "10.\n\nQuebra de linha logo após o número, 11. e o fim sem ponto 12",
+    "50. Última questão, sem nada depois",
+    "51. Termina com quebra de linha\n",
+    "52. \n\n",
+]
+
+
+class TestIterQuestionMatches(unittest.TestCase):
+
+    def test_matches_old_regex(self):
+        for text in TEXTS:
+            self.assertEqual(list(iter_question_matches(text)), OLD_QUESTION_RE.findall(text), text)
+
+    def test_matches_old_regex_without_re2(self):
+        with mock.patch.multiple(pdf_parser, _Q_START_RE=re.compile(r'(\d{2,3})\.\s+'),
+                                 _Q_END_RE=re.compile(r'\d{2,3}\.')):
+            for text in TEXTS:
+                self.assertEqual(list(iter_question_matches(text)), OLD_QUESTION_RE.findall(text), text)
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_yields_all_items_in_order(self):
+        self.assertEqual(list(prefetch(range(100), maxsize=2)), list(range(100)))
+        self.assertEqual(list(prefetch([])), [])
+
+    def test_producer_error_is_raised_in_caller(self):
+        def pages():
+            yield 1
+            yield 2
+            raise ValueError("PDF corrompido")
+
+        received = []
+        with self.assertRaisesRegex(ValueError, "PDF corrompido"):
+            for item in prefetch(pages()):
+                received.append(item)
+        self.assertEqual(received, [1, 2])
+
+    def test_early_stop_stops_the_producer(self):
+        produced = itertools.count()
+        threads_before = threading.active_count()
+
+        def pages():
+            for item in itertools.count():
+                next(produced)
+                yield item
+
+        items = prefetch(pages(), maxsize=2)
+        self.assertEqual([next(items) for _ in range(3)], [0, 1, 2])
+        items.close()
+
+        # The producer thread is joined, so nothing more is produced
+        count = next(produced)
+        self.assertLessEqual(count, 3 + 2 + 1)
+        self.assertEqual(next(produced), count + 1)
+        self.assertEqual(threading.active_count(), threads_before)
+
+
+if __name__ == '__main__':
+    unittest.main()